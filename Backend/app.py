@@ -1,17 +1,85 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, request, jsonify
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
-import os
+from werkzeug.exceptions import RequestEntityTooLarge
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import io
+import json
+import time
+from core.image_loader import ImageLoader, ImageRejectedError
+from services.batch_report import BatchReport
 from services.detector_service import DetectorService
+from services.inference_pool import InferencePool, PoolBusyError
+from services.model_registry import ModelRegistry
+from services.preflight import PreflightError
+from services.result_cache import FileCacheBackend, MemoryCacheBackend, ResultCache
+from utils.metrics import metrics
 from config.config import Config
 
+class InMemoryRequest(Request):
+    """Request that keeps uploaded files in memory instead of temporary files
+    
+    MAX_CONTENT_LENGTH bounds how much a request can hold.
+    """
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        return io.BytesIO()
+
 app = Flask(__name__)
+app.request_class = InMemoryRequest
 CORS(app)
 app.config.from_object(Config)
 
-# Initialize detector service
-detector_service = DetectorService()
-detector_service.load_model(Config.MODEL_PATH)
+def create_result_cache():
+    """Result cache for repeated uploads, as configured"""
+    if Config.RESULT_CACHE_BACKEND == 'memory':
+        backend = MemoryCacheBackend(Config.RESULT_CACHE_MAX_ENTRIES, Config.RESULT_CACHE_TTL)
+    elif Config.RESULT_CACHE_BACKEND == 'file':
+        backend = FileCacheBackend(Config.RESULT_CACHE_DIR, Config.RESULT_CACHE_MAX_ENTRIES,
+                                   Config.RESULT_CACHE_TTL)
+    else:
+        return None
+    return ResultCache(backend, use_perceptual_hash=Config.RESULT_CACHE_PERCEPTUAL)
+
+# Configured models, loaded once and swapped in place when switched or updated
+model_registry = ModelRegistry(Config.MODELS, Config.ACTIVE_MODEL,
+                               micro_batching=Config.MICRO_BATCHING,
+                               batch_window_ms=Config.MICRO_BATCH_WINDOW_MS,
+                               max_batch=Config.MICRO_BATCH_MAX_SIZE,
+                               result_cache=create_result_cache(),
+                               reload_interval=Config.MODEL_RELOAD_INTERVAL)
+if Config.CANDIDATE_MODEL:
+    model_registry.set_candidate(Config.CANDIDATE_MODEL, Config.CANDIDATE_MODE,
+                                 Config.CANDIDATE_SHARE)
+
+# Bounded pool that runs /api/predict inference off the request thread. Each
+# worker has at most one vector in a micro-batch, so with micro-batching the
+# pool is sized to let a batch actually fill up to MICRO_BATCH_MAX_SIZE
+inference_workers = Config.INFERENCE_WORKERS
+if Config.MICRO_BATCHING:
+    inference_workers = max(inference_workers, Config.MICRO_BATCH_MAX_SIZE)
+inference_pool = InferencePool(model_registry, inference_workers,
+                               Config.INFERENCE_QUEUE_SIZE)
+
+def busy_response():
+    """503 telling the client to back off while the inference queue is full"""
+    response = jsonify({'error': 'Server busy, try again later'})
+    response.headers['Retry-After'] = str(Config.RETRY_AFTER)
+    return response, 503
+
+def read_upload(file) -> bytes:
+    """Uploaded file contents, rejected early if the image header is unacceptable"""
+    data = file.stream.getvalue() if isinstance(file.stream, io.BytesIO) else file.read()
+    ImageLoader.probe_image(data)
+    return data
+
+def traced_predict(registry, data: bytes, submitted: float, localize: bool = False):
+    """Pool task: predict while recording the stage breakdown of this request"""
+    queue_wait = time.perf_counter() - submitted
+    metrics.observe('queue_wait', queue_wait)
+    result, trace = metrics.run_traced(registry.predict, data, localize=localize)
+    trace['stages_ms']['queue_wait'] = queue_wait * 1000
+    return result, trace
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -20,6 +88,11 @@ def health_check():
 @app.route('/api/predict', methods=['POST'])
 def predict():
     try:
+        # Several images may be sent at once under 'files' (or repeated 'file')
+        files = request.files.getlist('files') or request.files.getlist('file')
+        if len(files) > 1 or 'files' in request.files:
+            return predict_uploads(files)
+        
         if 'file' not in request.files:
             return jsonify({'error': 'No file provided'}), 400
         
@@ -28,25 +101,110 @@ def predict():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        if not detector_service.allowed_file(file.filename):
+        if not DetectorService.allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type'}), 400
         
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        start = time.perf_counter()
+        data = read_upload(file)
+        upload_read = time.perf_counter() - start
+        metrics.observe('upload_read', upload_read)
         
-        # Get prediction
-        result = detector_service.predict(filepath)
+        # Predict straight from the uploaded bytes, nothing is written to disk;
+        # ?localize=1 adds a tamper heatmap and the most suspicious regions
+        localize = request.args.get('localize') == '1'
+        submitted = time.perf_counter()
+        future = inference_pool.submit(
+            lambda registry: traced_predict(registry, data, submitted, localize))
+        try:
+            result, trace = future.result(timeout=Config.REQUEST_TIMEOUT)
+        except FutureTimeoutError:
+            future.cancel()
+            return jsonify({'error': 'Prediction timed out'}), 504
+        metrics.observe('request', time.perf_counter() - start)
         
-        # Clean up
-        os.remove(filepath)
+        # ?debug=1 returns the per-stage timing breakdown with the result
+        if request.args.get('debug') == '1':
+            trace['stages_ms']['upload_read'] = upload_read * 1000
+            result['timings'] = trace
         
         return jsonify(result), 200
         
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'Upload exceeds the maximum request size'}), 413
+    except PreflightError as e:
+        return jsonify(e.to_dict()), 422
+    except ImageRejectedError as e:
+        return jsonify({'error': str(e)}), 400
+    except PoolBusyError:
+        return busy_response()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def predict_uploads(files):
+    """Score several uploaded files in memory, one batch per inference worker
+    
+    Returns the same summary fields as predict_batch with one result per
+    file, in upload order. With ?stream=1 the results are streamed as NDJSON
+    as their batches complete, followed by a final summary line.
+    """
+    if len(files) > Config.MAX_FILES_PER_REQUEST:
+        return jsonify({'error': f'At most {Config.MAX_FILES_PER_REQUEST} files per request'}), 413
+    
+    results = [None] * len(files)
+    valid, uploads = [], []
+    for i, file in enumerate(files):
+        if not DetectorService.allowed_file(file.filename):
+            results[i] = {'error': 'Invalid file type'}
+            continue
+        try:
+            uploads.append(read_upload(file))
+            valid.append(i)
+        except ImageRejectedError as e:
+            results[i] = {'error': str(e)}
+    
+    batches = inference_pool.predict_many(uploads)
+    deadline = time.monotonic() + Config.REQUEST_TIMEOUT
+    
+    def iter_results():
+        """Yield per-file results in upload order as soon as they are known"""
+        scored = 0
+        emitted = 0
+        for size, future in batches:
+            try:
+                chunk = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                future.cancel()
+                chunk = [{'error': 'Prediction timed out'} for _ in range(size)]
+            except Exception as e:
+                chunk = [{'error': str(e)} for _ in range(size)]
+            for result in chunk:
+                results[valid[scored]] = result
+                scored += 1
+            while emitted < len(results) and results[emitted] is not None:
+                yield dict(results[emitted], image_name=files[emitted].filename)
+                emitted += 1
+        for i in range(emitted, len(results)):
+            yield dict(results[i], image_name=files[i].filename)
+    
+    if request.args.get('stream') == '1':
+        def generate():
+            report = BatchReport()
+            for result in iter_results():
+                if 'error' not in result:
+                    report.add(result)
+                yield json.dumps(result) + '\n'
+            summary = report.to_dict()
+            del summary['results']
+            yield json.dumps({'summary': summary}) + '\n'
+        return Response(generate(), mimetype='application/x-ndjson')
+    
+    report = BatchReport()
+    all_results = list(iter_results())
+    for result in all_results:
+        if 'error' not in result:
+            report.add(result)
+    return jsonify(report.to_dict(all_results)), 200
+
 @app.route('/api/batch-predict', methods=['POST'])
 def batch_predict():
     try:
@@ -54,13 +212,77 @@ def batch_predict():
             return jsonify({'error': 'No folder path provided'}), 400
         
         folder_path = request.json['folder_path']
-        results = detector_service.predict_batch(folder_path)
+        # Registry detectors score in this process, without forking a pool
+        results = model_registry.detector().predict_batch(folder_path)
         
         return jsonify(results), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/models', methods=['GET'])
+def list_models():
+    """Configured models, which one is active and per-model latency and divergence"""
+    return jsonify(model_registry.describe()), 200
+
+@app.route('/api/models/active', methods=['POST'])
+def set_active_model():
+    """Switch the served model to another configured one"""
+    try:
+        model_registry.set_active((request.json or {}).get('name'))
+        return jsonify(model_registry.describe()), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/models/candidate', methods=['POST'])
+def set_candidate_model():
+    """Score a share of traffic with a candidate model, in 'shadow' or 'ab' mode
+    
+    A null name stops candidate scoring.
+    """
+    body = request.json or {}
+    share = body.get('share', Config.CANDIDATE_SHARE)
+    if not isinstance(share, (int, float)):
+        return jsonify({'error': 'share must be a number between 0 and 1'}), 400
+    try:
+        model_registry.set_candidate(body.get('name'), body.get('mode', 'shadow'), float(share))
+        return jsonify(model_registry.describe()), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/models/<name>/reload', methods=['POST'])
+def reload_model(name):
+    """Reload a configured model from its file now"""
+    try:
+        model_registry.load(name)
+        return jsonify(model_registry.describe()), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Stage timing histograms in the Prometheus text format"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/debug/profiling', methods=['GET', 'POST'])
+def profiling():
+    """Get or set the share of requests captured with cProfile"""
+    if request.method == 'POST':
+        sample_rate = (request.json or {}).get('sample_rate')
+        if not isinstance(sample_rate, (int, float)) or not 0 <= sample_rate <= 1:
+            return jsonify({'error': 'sample_rate must be a number between 0 and 1'}), 400
+        metrics.profile_rate = float(sample_rate)
+    
+    return jsonify({
+        'sample_rate': metrics.profile_rate,
+        'profiles': list(metrics.profiles)
+    }), 200
+
 if __name__ == '__main__':
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,216 @@
+"""
+Benchmark suite for the feature extraction and inference hot paths
+Uses synthetic card-like images, so no real Aadhaar data is needed. Results
+are written as JSON and can be compared against a stored baseline:
+
+  python benchmark.py --output bench.json
+  python benchmark.py --baseline bench.json --tolerance 0.15
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from config.config import Config
+from core.feature_extractor import FeatureExtractor
+from core.image_analyzer import ImageAnalyzer
+from core.image_loader import ImageLoader
+from utils.synthetic_images import encode_image, generate_card_image
+
+def summarize(durations: list, peak_bytes: int = None) -> dict:
+    """Latency percentiles and throughput for a list of durations in seconds"""
+    ms = np.array(durations) * 1000
+    summary = {
+        'n': len(durations),
+        'mean_ms': float(np.mean(ms)),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'throughput_per_s': float(len(durations) / max(np.sum(durations), 1e-12))
+    }
+    if peak_bytes is not None:
+        summary['peak_mem_mb'] = peak_bytes / (1024 * 1024)
+    return summary
+
+def measure(fn, repeats: int, warmup: int = 1) -> dict:
+    """Time fn repeatedly, then measure its peak traced memory in one extra call"""
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    
+    # Memory is traced in a separate call so tracing does not skew timings
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize(durations, peak)
+
+def feature_stages(img: np.ndarray, data: bytes) -> dict:
+    """The individual stages of FeatureExtractor.extract_features"""
+    analyzer = ImageAnalyzer()
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return {
+        'decode': lambda: ImageLoader.decode_image(data),
+        'ela': lambda: analyzer.calculate_ela(img),
+        'text_regions': lambda: analyzer.analyze_text_regions(gray),
+        'canny': lambda: cv2.Canny(gray, 50, 150),
+        'histograms': lambda: [cv2.calcHist([img], [c], None, [256], [0, 256]) for c in range(3)],
+        'dct': lambda: analyzer.detect_jpeg_artifacts(gray),
+        'block_dct': lambda: analyzer.analyze_dct_blocks(gray),
+        'noise': lambda: analyzer.estimate_noise(gray),
+        'extract_features': lambda: FeatureExtractor().extract_features(data)
+    }
+
+def train_synthetic_model(model_path: str, n_per_class: int = 20):
+    """Train a small model on synthetic real/tampered cards"""
+    from models.ml_model import MLModel
+    extractor = FeatureExtractor()
+    X, y = [], []
+    for i in range(n_per_class):
+        for tampered in (False, True):
+            img = generate_card_image(540, seed=1000 + i, tampered=tampered)
+            X.append(extractor.extract_features(encode_image(img)))
+            y.append(0 if tampered else 1)
+    ml_model = MLModel()
+    ml_model.train(np.array(X), np.array(y))
+    ml_model.feature_config = extractor.config
+    ml_model.save(model_path)
+
+def run(heights: list, formats: list, repeats: int, batch_size: int) -> dict:
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='aadhaar-bench-')
+    model_path = os.path.join(workdir, 'model.pkl')
+    train_synthetic_model(model_path)
+    
+    # Import the app only once the synthetic model is in place
+    Config.MODEL_PATH = model_path
+    Config.MODELS = {'benchmark': model_path}
+    Config.ACTIVE_MODEL = 'benchmark'
+    Config.CANDIDATE_MODEL = None
+    # Every repeat posts the same bytes, so a result cache would only time cache hits
+    Config.RESULT_CACHE_BACKEND = None
+    from services.detector_service import DetectorService
+    from app import app, inference_pool, model_registry
+    detector = DetectorService(workers=1)
+    detector.load_model(model_path)
+    client = app.test_client()
+    
+    try:
+        for height in heights:
+            img = generate_card_image(height, seed=height)
+            for fmt in formats:
+                data = encode_image(img, fmt)
+                decoded = ImageLoader.decode_image(data)
+                label = f"{decoded.shape[0]}x{decoded.shape[1]}.{fmt}"
+                print(f"Benchmarking {label} ({len(data) / 1024:.0f} KB)...")
+            
+                for stage, fn in feature_stages(decoded, data).items():
+                    results[f"stage/{stage}/{label}"] = measure(fn, repeats)
+            
+                results[f"predict/{label}"] = measure(lambda: detector.predict(data), repeats)
+            
+                def api_predict():
+                    response = client.post('/api/predict',
+                                           data={'file': (io.BytesIO(data), f'card.{fmt}')},
+                                           content_type='multipart/form-data')
+                    if response.status_code != 200:
+                        raise RuntimeError(f"/api/predict returned {response.status_code}")
+                results[f"api_predict/{label}"] = measure(api_predict, repeats)
+            
+                folder = os.path.join(workdir, label)
+                os.makedirs(folder, exist_ok=True)
+                for i in range(batch_size):
+                    with open(os.path.join(folder, f'card_{i}.{fmt}'), 'wb') as f:
+                        f.write(data)
+                batch = measure(lambda: detector.predict_batch(folder), max(1, repeats // 5))
+                # Report batch throughput in images rather than calls
+                batch['throughput_per_s'] *= batch_size
+                batch['images_per_call'] = batch_size
+                results[f"predict_batch/{label}"] = batch
+    finally:
+        inference_pool.shutdown()
+        model_registry.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Benchmarks whose p50 latency regressed by more than tolerance"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        ratio = current['p50_ms'] / max(previous['p50_ms'], 1e-9)
+        current['baseline_p50_ms'] = previous['p50_ms']
+        current['p50_ratio'] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append((name, previous['p50_ms'], current['p50_ms'], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark feature extraction and inference")
+    parser.add_argument('--heights', type=int, nargs='+', default=[540, 1080, 2160],
+                        help="Synthetic card heights in pixels (width follows the ID-1 ratio)")
+    parser.add_argument('--formats', nargs='+', default=['jpg', 'png'])
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=16,
+                        help="Images per predict_batch call")
+    parser.add_argument('--output', help="Write results JSON to this file")
+    parser.add_argument('--baseline', help="Compare p50 latencies against this results JSON")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="Allowed p50 slowdown versus the baseline (0.10 = 10%%)")
+    args = parser.parse_args()
+    
+    benchmarks = run(args.heights, args.formats, args.repeats, args.batch_size)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'cpu_count': os.cpu_count(),
+            'repeats': args.repeats,
+            'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        },
+        'benchmarks': benchmarks
+    }
+    
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(benchmarks, baseline['benchmarks'], args.tolerance)
+    
+    print("\n" + "="*80)
+    print(f"{'Benchmark':<44}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'/s':>6}")
+    print("="*80)
+    for name, r in benchmarks.items():
+        print(f"{name:<44}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['throughput_per_s']:>6.0f}")
+    print("="*80)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to: {args.output}")
+    
+    if regressions:
+        print("\nRegressions against baseline:")
+        for name, before, after, ratio in regressions:
+            print(f"  • {name}: {before:.2f} ms -> {after:.2f} ms ({(ratio - 1) * 100:+.0f}%)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
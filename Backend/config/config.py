@@ -9,12 +9,103 @@ class Config:
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'bmp', 'tiff'}
+    MAX_FILES_PER_REQUEST = 20  # all files together stay within MAX_CONTENT_LENGTH
+    # Larger images are rejected from their header, before decoding
+    MAX_IMAGE_PIXELS = 50_000_000
     
     # Model settings
     MODEL_PATH = os.path.join(BASE_DIR, 'saved_models', 'aadhaar_only_model_TEXT.pkl')
-    # MODEL_PATH = os.path.join(BASE_DIR, 'saved_models', 'aadhaar_detector.pkl')
+    
+    # Models the API keeps loaded, by name; the active one can be switched at
+    # runtime (/api/models/active) and each is reloaded when its file changes
+    MODELS = {
+        'text': MODEL_PATH,
+        'detector': os.path.join(BASE_DIR, 'saved_models', 'aadhaar_detector.pkl')
+    }
+    ACTIVE_MODEL = 'text'
+    MODEL_RELOAD_INTERVAL = 5  # seconds between model file checks (0 disables)
+    
+    # Candidate model scored on a sampled share of requests: 'shadow' scores it
+    # in the background to compare with the served result, 'ab' serves it
+    CANDIDATE_MODEL = None
+    CANDIDATE_MODE = 'shadow'
+    CANDIDATE_SHARE = 0.1
+    SHADOW_MAX_PENDING = 16  # shadow scoring beyond this backlog is skipped
 
+    # Used when the loaded model carries no threshold chosen by cross-validation
     THRESHOLD = 0.45
+    # Scores this far below the threshold are reported as "Manual Review"
+    MANUAL_REVIEW_MARGIN = 0.05
+    
+    # Stratified folds used by train.py to evaluate the model and choose its threshold
+    CV_FOLDS = 5
+    
+    # Longest image side used for feature analysis when training new models
+    # (None analyses at native resolution; loaded models use their own setting)
+    ANALYSIS_SIZE = None
+    
+    # Two-stage cascade: a cheap model decides confident cases, loaded from
+    # <model>_cascade<ext> when present (train with train.py --cascade)
+    CASCADE_ENABLED = True
+    CASCADE_CONFIDENCE = 0.9
+    CASCADE_REPORT_CONFIDENCES = [0.7, 0.8, 0.9, 0.95]
+    
+    # Preflight checks rejecting non-card images before feature extraction:
+    # shorter side in pixels, long/short side ratio (ID-1 cards are 1.586),
+    # grayscale standard deviation and histogram entropy (bits) of a thumbnail
+    PREFLIGHT_ENABLED = True
+    PREFLIGHT_MIN_SIDE = 200
+    PREFLIGHT_ASPECT_RANGE = (1.2, 2.0)
+    PREFLIGHT_MIN_CONTRAST = 6.0
+    PREFLIGHT_MIN_ENTROPY = 1.5
+    
+    # Tamper localization (/api/predict?localize=1): tile grid (rows, cols)
+    # and number of most suspicious tiles returned
+    LOCALIZATION_GRID = (8, 12)
+    LOCALIZATION_TOP_K = 3
+    
+    # Worker processes used for feature extraction in training and batch prediction
+    NUM_WORKERS = os.cpu_count() or 1
+    
+    # Images scored together per step of a streaming batch prediction
+    BATCH_CHUNK_SIZE = 256
+    
+    # Persistent feature cache used by training and batch prediction
+    FEATURE_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'features')
+    FEATURE_CACHE_MAX_ENTRIES = 500000
+    # During training, new cache entries are written after this many images
+    FEATURE_CACHE_FLUSH_EVERY = 20000
+    
+    # Training feature matrices larger than this are memory-mapped to a temporary file
+    TRAINING_MEMMAP_BYTES = 256 * 1024 * 1024
+    
+    # Serving: inference worker threads, sharing the registry's loaded models
+    INFERENCE_WORKERS = min(4, os.cpu_count() or 1)
+    INFERENCE_QUEUE_SIZE = 32
+    REQUEST_TIMEOUT = 30  # seconds a request waits for its prediction
+    RETRY_AFTER = 1  # seconds suggested to clients when the queue is full
+    
+    # Serving: score concurrent requests together in one model call. Enabling
+    # it raises the inference workers to MICRO_BATCH_MAX_SIZE, since a batch
+    # only ever holds one request per worker. Pays off under heavy concurrent
+    # load; a lone request waits the full window
+    MICRO_BATCHING = False
+    MICRO_BATCH_WINDOW_MS = 5
+    MICRO_BATCH_MAX_SIZE = 32
+    
+    # Serving: cache of prediction results for resubmitted uploads
+    RESULT_CACHE_BACKEND = 'memory'  # 'memory', 'file' (shared by workers) or None
+    RESULT_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'results')
+    RESULT_CACHE_MAX_ENTRIES = 10000
+    RESULT_CACHE_TTL = 3600  # seconds
+    # Also match re-encoded copies by perceptual hash. Risky: the hash is built
+    # to ignore small local edits, which is what a forgery is, so an edited copy
+    # of a genuine card can be served the genuine card's cached REAL verdict
+    RESULT_CACHE_PERCEPTUAL = False
+    
+    # Instrumentation: stage histograms at /api/metrics and sampled cProfile
+    METRICS_ENABLED = True
+    PROFILE_SAMPLE_RATE = 0.0  # share of requests profiled, changeable at runtime
     
     # Training data paths
     REAL_IMAGES_FOLDER = os.path.join(BASE_DIR, 'data', 'real')
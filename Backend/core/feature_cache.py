@@ -0,0 +1,124 @@
+import os
+import glob
+import time
+import hashlib
+import numpy as np
+from typing import Dict, Optional
+
+class FeatureCache:
+    """Persistent feature store keyed by image content hash
+    
+    Entries live in a single structured .npy file per extractor version,
+    opened memory-mapped so only the rows that are looked up are read.
+    Versions look like '<code>-<settings>': stores written by different
+    feature code are deleted on open, other settings of the same code are
+    kept.
+    """
+    
+    HASH_LENGTH = 64
+    
+    def __init__(self, cache_dir: str, version: str, max_entries: int = 500000):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.max_entries = max_entries
+        self.path = os.path.join(cache_dir, f'features-{version}.npy')
+        self._pending: Dict[bytes, np.ndarray] = {}
+        self._touched: Dict[int, float] = {}
+        
+        os.makedirs(cache_dir, exist_ok=True)
+        self._remove_stale()
+        self._load()
+    
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Content hash used as cache key"""
+        return hashlib.sha256(data).hexdigest()
+    
+    @staticmethod
+    def hash_file(filepath: str) -> str:
+        """Content hash of a file, read in chunks"""
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _remove_stale(self):
+        """Delete stores written by a different version of the feature code"""
+        code_version = self.version.split('-')[0]
+        for path in glob.glob(os.path.join(self.cache_dir, 'features-*.npy')):
+            name = os.path.basename(path)[len('features-'):]
+            if name.split('-')[0] != code_version:
+                os.remove(path)
+    
+    def _load(self):
+        self._entries = None
+        self._index: Dict[bytes, int] = {}
+        if os.path.exists(self.path):
+            self._entries = np.load(self.path, mmap_mode='r')
+            self._index = {key: row for row, key in enumerate(self._entries['key'])}
+    
+    def __len__(self) -> int:
+        return len(self._index) + len(self._pending)
+    
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return cached features for a content hash, or None"""
+        key = key.encode()
+        if key in self._pending:
+            return self._pending[key]
+        row = self._index.get(key)
+        if row is None:
+            return None
+        self._touched[row] = time.time()
+        return np.array(self._entries['features'][row], dtype=np.float64)
+    
+    def put(self, key: str, features: np.ndarray):
+        """Add features for a content hash (written on flush)"""
+        self._pending[key.encode()] = np.asarray(features, dtype=np.float64)
+    
+    def flush(self):
+        """Write pending entries, evicting least recently used ones beyond max_entries
+        
+        Recency of cache hits is only saved along with new entries, so a
+        pass that only hits the cache never rewrites the store.
+        """
+        if not self._pending:
+            return
+        
+        n_features = self._n_features()
+        dtype = np.dtype([('key', f'S{self.HASH_LENGTH}'),
+                          ('last_used', '<f8'),
+                          ('features', '<f8', (n_features,))])
+        
+        now = time.time()
+        new = np.zeros(len(self._pending), dtype=dtype)
+        for row, (key, features) in enumerate(self._pending.items()):
+            new[row] = (key, now, features)
+        
+        if self._entries is not None:
+            old = np.array(self._entries)
+            for row, last_used in self._touched.items():
+                old['last_used'][row] = last_used
+            old = old[~np.isin(old['key'], new['key'])]
+            merged = np.concatenate([old, new])
+        else:
+            merged = new
+        
+        if len(merged) > self.max_entries:
+            keep = np.argsort(merged['last_used'], kind='stable')[-self.max_entries:]
+            merged = merged[np.sort(keep)]
+        
+        # Release the memory map before replacing the file under it
+        self._entries = None
+        tmp_path = self.path + '.tmp.npy'
+        np.save(tmp_path, merged)
+        os.replace(tmp_path, self.path)
+        
+        self._pending = {}
+        self._touched = {}
+        self._load()
+    
+    def _n_features(self) -> int:
+        if self._pending:
+            return len(next(iter(self._pending.values())))
+        return self._entries.dtype['features'].shape[0]
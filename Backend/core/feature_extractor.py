@@ -1,68 +1,210 @@
 import cv2
+import hashlib
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple, Union
+from core import feature_registry, image_analyzer
+from core.feature_registry import (DEFAULT_FEATURE_NAMES, FEATURES_BY_NAME, LEGACY_FEATURE_NAMES,
+                                   FeatureContext, validate_feature_names)
 from core.image_analyzer import ImageAnalyzer
+from core.image_loader import ImageLoader, ImageRejectedError
+from utils.metrics import metrics
+
+# Per-process extractor, preflight and cascade used by pool workers, set up by _init_worker
+_worker_extractor = None
+_worker_preflight = None
+_worker_cascade = None
+
+def _init_worker(extractor: 'FeatureExtractor', preflight=None, cascade=None):
+    global _worker_extractor, _worker_preflight, _worker_cascade
+    _worker_extractor = extractor
+    _worker_preflight = preflight
+    _worker_cascade = cascade
+
+def _extract_safe(extractor: 'FeatureExtractor', image, preflight=None,
+                  cascade=None) -> Tuple[Optional[np.ndarray], Optional[Union[str, Dict]]]:
+    if preflight is not None:
+        try:
+            # A path is read once here; its bytes are what gets decoded
+            image = preflight.check(image)
+        except ImageRejectedError as e:
+            return None, e.to_dict()
+    try:
+        if cascade is not None:
+            return extractor.extract_cascaded(image, cascade), None
+        return extractor.extract_features(image), None
+    except Exception as e:
+        return None, str(e)
+
+def _worker_extract(image) -> Tuple[Optional[np.ndarray], Optional[Union[str, Dict]]]:
+    return _extract_safe(_worker_extractor, image, _worker_preflight, _worker_cascade)
 
 class FeatureExtractor:
     """Extracts ML features from images"""
     
-    def __init__(self):
+    def __init__(self, analysis_size: Optional[int] = None, feature_names: List[str] = None):
         self.image_analyzer = ImageAnalyzer()
+        # Longest side images are downsampled to before analysis (None = native)
+        self.analysis_size = analysis_size
+        # Features produced, in order (see core.feature_registry)
+        self.feature_names = list(feature_names or DEFAULT_FEATURE_NAMES)
+        validate_feature_names(self.feature_names)
     
-    def extract_features(self, image_path: str) -> np.ndarray:
-        """Extract all ML features from image"""
-        img = cv2.imread(image_path)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        features = []
-        
-        # ELA features
-        ela_img = self.image_analyzer.calculate_ela(image_path)
-        features.extend([
-            np.mean(ela_img),
-            np.std(ela_img),
-            np.max(ela_img)
-        ])
-        
-        # Text region features
-        text_analysis = self.image_analyzer.analyze_text_regions(gray)
-        features.extend([
-            text_analysis['mean_area'],
-            text_analysis['std_area'],
-            text_analysis['num_regions']
-        ])
-        
-        # Edge features
-        edges = cv2.Canny(gray, 50, 150)
-        features.extend([
-            np.mean(edges),
-            np.std(edges)
-        ])
-        
-        # Color histogram features
-        hist_b = cv2.calcHist([img], [0], None, [256], [0, 256])
-        hist_g = cv2.calcHist([img], [1], None, [256], [0, 256])
-        hist_r = cv2.calcHist([img], [2], None, [256], [0, 256])
-        features.extend([
-            np.std(hist_b),
-            np.std(hist_g),
-            np.std(hist_r)
-        ])
-        
-        # JPEG artifacts
-        features.append(self.image_analyzer.detect_jpeg_artifacts(img))
-        
-        # Image dimensions
-        h, w = gray.shape
-        features.extend([w, h, w * h])
+    @property
+    def version(self) -> str:
+        """'<code hash>-<settings>' identifying the features this extractor produces"""
+        digest = hashlib.sha256()
+        for module_file in (__file__, image_analyzer.__file__, feature_registry.__file__):
+            with open(module_file, 'rb') as f:
+                digest.update(f.read())
+        settings = str(self.analysis_size or 'native')
+        if self.feature_names != DEFAULT_FEATURE_NAMES:
+            names = ','.join(self.feature_names).encode()
+            settings += '-' + hashlib.sha256(names).hexdigest()[:8]
+        return f"{digest.hexdigest()[:16]}-{settings}"
+    
+    @property
+    def config(self) -> dict:
+        """Settings a trained model needs to reproduce its features"""
+        return {'analysis_size': self.analysis_size, 'feature_names': list(self.feature_names)}
+    
+    def configure(self, config: dict):
+        """Apply settings recorded with a trained model
         
-        # Noise level
-        noise = self.image_analyzer.estimate_noise(gray)
-        features.append(noise)
+        Models saved before features were named expect the full original
+        feature vector.
+        """
+        feature_names = list(config.get('feature_names') or LEGACY_FEATURE_NAMES)
+        validate_feature_names(feature_names)
+        self.analysis_size = config.get('analysis_size')
+        self.feature_names = feature_names
+    
+    def _resize_for_analysis(self, img: np.ndarray) -> np.ndarray:
+        """Downsample so the longest side is at most analysis_size"""
+        if not self.analysis_size:
+            return img
+        h, w = img.shape[:2]
+        scale = self.analysis_size / max(h, w)
+        if scale >= 1:
+            return img
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    
+    def extract_features(self, image: Union[str, bytes, np.ndarray],
+                         feature_names: List[str] = None) -> np.ndarray:
+        """Extract ML features from image
+
+        The image may be a path, raw encoded bytes or a decoded BGR array. It
+        is decoded exactly once and the same pixels feed every feature. Only
+        the requested features (by default self.feature_names) and the
+        intermediates they depend on are computed. With analysis_size set,
+        everything but the dimension and 8x8 block grid features is computed
+        on a downsampled copy, capping the per-image cost.
+        """
+        context = self.prepare(image)
+        return self.compute(context, feature_names or self.feature_names)
+    
+    def prepare(self, image: Union[str, bytes, np.ndarray]) -> FeatureContext:
+        """Decode (and downsample) an image into a context for compute"""
+        with metrics.stage('decode'):
+            img = ImageLoader.to_array(image)
+        native_h, native_w = img.shape[:2]
+        metrics.record_image(native_h, native_w)
+        with metrics.stage('resize'):
+            analysis_img = self._resize_for_analysis(img)
+        return FeatureContext(analysis_img, (native_h, native_w), img)
+    
+    @staticmethod
+    def compute(context: FeatureContext, feature_names: List[str]) -> np.ndarray:
+        """Compute named features, reusing intermediates already in context"""
+        values = []
+        for name in feature_names:
+            feature = FEATURES_BY_NAME[name]
+            values.append(feature.compute(context.get(feature.source)))
+        return np.array(values, dtype=np.float64)
+    
+    def extract_cascaded(self, image: Union[str, bytes, np.ndarray],
+                         cascade) -> Tuple[float, Optional[np.ndarray]]:
+        """Score of a cascade's first stage and, only when it is unsure, the full features"""
+        context = self.prepare(image)
+        cheap_features = self.compute(context, cascade.feature_names)
+        with metrics.stage('cascade_model'):
+            cheap_score = cascade.predict_proba(cheap_features)
+        if cascade.is_confident(cheap_score):
+            return cheap_score, None
+        return cheap_score, self.compute(context, self.feature_names)
+    
+    def extract_many(self, images: List[Union[str, bytes, np.ndarray]], workers: int = 1,
+                     preflight=None, cascade=None
+                     ) -> List[Tuple[Optional[np.ndarray], Optional[Union[str, Dict]]]]:
+        """Extract features for many images, optionally across a process pool
         
-        # Brightness and contrast
-        features.extend([
-            np.mean(gray),
-            np.std(gray)
-        ])
+        Returns a (features, error) pair per image in input order. A failing
+        image yields (None, message) instead of aborting the whole run. With
+        a preflight (see services.preflight), each image is checked first,
+        in the same worker, and a rejected one yields (None, rejection dict).
+        With a cascade (see models.cascade_model), features are replaced by
+        the extract_cascaded pair.
+        """
+        with ExtractionPool(self, min(workers, len(images)), preflight, cascade) as pool:
+            return pool.map(images)
+
+class ExtractionPool:
+    """Worker processes reused by every extract_many call of a run
+    
+    Workers are set up once with the extractor, preflight and cascade, and
+    started on first use, so a run over many chunks forks them only once.
+    With a single worker, images are extracted in the calling process. If
+    a worker dies (e.g. crashing on a corrupt image), the images of that
+    call are retried one at a time in fresh workers, so only the image
+    that crashes it fails.
+    """
+    
+    def __init__(self, extractor: FeatureExtractor, workers: int, preflight=None, cascade=None):
+        self.extractor = extractor
+        self.workers = workers
+        self.preflight = preflight
+        self.cascade = cascade
+        self._executor = None
+    
+    def map(self, images: List[Union[str, bytes, np.ndarray]]
+            ) -> List[Tuple[Optional[np.ndarray], Optional[Union[str, Dict]]]]:
+        """FeatureExtractor.extract_many results for images"""
+        if self.workers <= 1 or len(images) < 2:
+            return [_extract_safe(self.extractor, image, self.preflight, self.cascade)
+                    for image in images]
         
-        return np.array(features)
\ No newline at end of file
+        chunksize = max(1, len(images) // (self.workers * 4))
+        try:
+            return list(self._start().map(_worker_extract, images, chunksize=chunksize))
+        except BrokenProcessPool:
+            print(f"An extraction worker crashed, retrying {len(images)} images one at a time")
+            self.close()
+            return [self._extract_isolated(image) for image in images]
+    
+    def _start(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(self.extractor, self.preflight, self.cascade))
+        return self._executor
+    
+    def _extract_isolated(self, image) -> Tuple[Optional[np.ndarray], Optional[Union[str, Dict]]]:
+        """Extract one image on its own, so a crash fails only this image"""
+        try:
+            return self._start().submit(_worker_extract, image).result()
+        except BrokenProcessPool:
+            self.close()
+            return None, "Extraction worker process crashed on this image"
+    
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+    
+    def __enter__(self) -> 'ExtractionPool':
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,155 @@
+import cv2
+import numpy as np
+from typing import Callable, Dict, Iterable, List, NamedTuple, Tuple
+from core.image_analyzer import ImageAnalyzer
+from utils.metrics import metrics
+
+class Intermediate(NamedTuple):
+    """A shared value computed once per image and reused by several features"""
+    name: str
+    depends: Tuple[str, ...]
+    cost: float  # relative cost, roughly ms on a 540x856 card
+    compute: Callable[['FeatureContext'], object]
+
+class Feature(NamedTuple):
+    """A single model feature derived from one intermediate"""
+    name: str
+    source: str
+    compute: Callable[[object], float]
+
+class FeatureContext:
+    """Lazily computed intermediates for one decoded image
+    
+    Each intermediate is computed at most once, on first use, so features
+    that share e.g. the grayscale conversion never repeat it. native_image
+    is the image before downsampling for analysis, if it was downsampled.
+    """
+    
+    def __init__(self, image: np.ndarray, native_size: Tuple[int, int],
+                 native_image: np.ndarray = None):
+        self._values = {'image': image, 'native_size': native_size,
+                        'native_image': image if native_image is None else native_image}
+    
+    def get(self, name: str):
+        if name not in self._values:
+            self._values[name] = INTERMEDIATES[name].compute(self)
+        return self._values[name]
+
+def _grayscale(context: FeatureContext) -> np.ndarray:
+    with metrics.stage('grayscale'):
+        return cv2.cvtColor(context.get('image'), cv2.COLOR_BGR2GRAY)
+
+def _native_grayscale(context: FeatureContext) -> np.ndarray:
+    native = context.get('native_image')
+    if native is context.get('image'):
+        return context.get('gray')
+    with metrics.stage('grayscale'):
+        return cv2.cvtColor(native, cv2.COLOR_BGR2GRAY)
+
+def _edges(context: FeatureContext) -> np.ndarray:
+    with metrics.stage('edges'):
+        return cv2.Canny(context.get('gray'), 50, 150)
+
+def _noise_residual(context: FeatureContext) -> np.ndarray:
+    # The estimate_noise kernel, without clipping the response to uint8
+    kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+    with metrics.stage('noise_residual'):
+        return np.abs(cv2.filter2D(context.get('gray'), cv2.CV_32F, kernel))
+
+def _histograms(context: FeatureContext) -> List[np.ndarray]:
+    img = context.get('image')
+    with metrics.stage('histograms'):
+        return [cv2.calcHist([img], [channel], None, [256], [0, 256]) for channel in range(3)]
+
+INTERMEDIATES: Dict[str, Intermediate] = {i.name: i for i in [
+    Intermediate('image', (), 0.0, None),
+    Intermediate('native_size', (), 0.0, None),
+    Intermediate('native_image', (), 0.0, None),
+    Intermediate('gray', ('image',), 1.0, _grayscale),
+    # Same as gray unless the image was downsampled for analysis
+    Intermediate('native_gray', ('native_image', 'gray'), 0.0, _native_grayscale),
+    Intermediate('ela', ('image',), 18.0,
+                 lambda c: ImageAnalyzer.calculate_ela(c.get('image'))),
+    Intermediate('text_regions', ('gray',), 0.7,
+                 lambda c: ImageAnalyzer.analyze_text_regions(c.get('gray'))),
+    Intermediate('edges', ('gray',), 1.5, _edges),
+    Intermediate('histograms', ('image',), 1.3, _histograms),
+    Intermediate('jpeg_artifacts', ('gray',), 7.0,
+                 lambda c: ImageAnalyzer.detect_jpeg_artifacts(c.get('gray'))),
+    # The 8x8 block grid only lines up at native resolution
+    Intermediate('dct_blocks', ('native_gray',), 6.0,
+                 lambda c: ImageAnalyzer.analyze_dct_blocks(c.get('native_gray'))),
+    # Only used for tamper localization
+    Intermediate('noise_residual', ('gray',), 1.2, _noise_residual),
+    Intermediate('noise', ('gray',), 0.9,
+                 lambda c: ImageAnalyzer.estimate_noise(c.get('gray'))),
+]}
+
+# The original feature vector first, in the order pre-registry models expect
+FEATURES: List[Feature] = [
+    Feature('ela_mean', 'ela', np.mean),
+    Feature('ela_std', 'ela', np.std),
+    Feature('ela_max', 'ela', np.max),
+    Feature('text_mean_area', 'text_regions', lambda t: t['mean_area']),
+    Feature('text_std_area', 'text_regions', lambda t: t['std_area']),
+    Feature('text_num_regions', 'text_regions', lambda t: t['num_regions']),
+    Feature('edge_mean', 'edges', np.mean),
+    Feature('edge_std', 'edges', np.std),
+    Feature('hist_std_b', 'histograms', lambda h: np.std(h[0])),
+    Feature('hist_std_g', 'histograms', lambda h: np.std(h[1])),
+    Feature('hist_std_r', 'histograms', lambda h: np.std(h[2])),
+    Feature('jpeg_artifacts', 'jpeg_artifacts', lambda value: value),
+    Feature('width', 'native_size', lambda size: size[1]),
+    Feature('height', 'native_size', lambda size: size[0]),
+    Feature('area', 'native_size', lambda size: size[0] * size[1]),
+    Feature('noise', 'noise', lambda value: value),
+    Feature('brightness', 'gray', np.mean),
+    Feature('contrast', 'gray', np.std),
+    # 8x8 block grid statistics, computed at native resolution
+    Feature('dct_high_freq', 'dct_blocks', lambda d: d['high_freq']),
+    Feature('dct_energy_std', 'dct_blocks', lambda d: d['energy_std']),
+    Feature('dct_zero_ac', 'dct_blocks', lambda d: d['zero_ac']),
+    Feature('double_compression', 'dct_blocks', lambda d: d['double_compression']),
+    Feature('blockiness', 'dct_blocks', lambda d: d['blockiness']),
+    Feature('shifted_blockiness', 'dct_blocks', lambda d: d['shifted_blockiness']),
+]
+
+FEATURES_BY_NAME: Dict[str, Feature] = {f.name: f for f in FEATURES}
+FEATURE_NAMES: List[str] = [f.name for f in FEATURES]
+
+# Feature vector of models saved before features were named
+LEGACY_FEATURE_NAMES: List[str] = FEATURE_NAMES[:18]
+
+# Features new models are trained on: the block grid statistics replace the
+# full-image DCT mean
+DEFAULT_FEATURE_NAMES: List[str] = [name for name in LEGACY_FEATURE_NAMES
+                                    if name != 'jpeg_artifacts'] + FEATURE_NAMES[18:]
+
+# Features used by the first cascade stage: no ELA, DCT, contours or edges
+CHEAP_FEATURE_NAMES: List[str] = ['width', 'height', 'area', 'brightness', 'contrast',
+                                  'hist_std_b', 'hist_std_g', 'hist_std_r']
+
+def validate_feature_names(names: Iterable[str]):
+    """Raise ValueError for names not in the registry"""
+    unknown = [name for name in names if name not in FEATURES_BY_NAME]
+    if unknown:
+        raise ValueError(f"Unknown features: {', '.join(unknown)}")
+
+def required_intermediates(names: Iterable[str]) -> List[str]:
+    """All intermediates (with dependencies) needed to compute the features"""
+    required = []
+    
+    def visit(name: str):
+        if name in required:
+            return
+        for dependency in INTERMEDIATES[name].depends:
+            visit(dependency)
+        required.append(name)
+    
+    for name in names:
+        visit(FEATURES_BY_NAME[name].source)
+    return required
+
+def feature_cost(names: Iterable[str]) -> float:
+    """Relative cost of computing a set of features, shared work counted once"""
+    return sum(INTERMEDIATES[name].cost for name in required_intermediates(names))
@@ -1,45 +1,151 @@
 import cv2
 import numpy as np
 from PIL import Image
-import os
+from typing import Union
+import io
+from utils.metrics import metrics
+
+# Orthonormal 8x8 DCT-II basis (rows are frequencies), as used by JPEG
+_DCT_BASIS = np.array([[np.sqrt((1 if k == 0 else 2) / 8) * np.cos(np.pi * (2 * i + 1) * k / 16)
+                        for i in range(8)] for k in range(8)], dtype=np.float32)
+# Weights averaging the high-frequency (u + v >= 8) coefficients of a block
+_HIGH_FREQ = (np.add.outer(np.arange(8), np.arange(8)) >= 8).ravel()
+_HIGH_FREQ_WEIGHTS = (_HIGH_FREQ / _HIGH_FREQ.sum()).astype(np.float32)
+# Low-frequency AC coefficients whose histograms show double quantization
+_DQ_MODES = [(0, 1), (1, 0), (1, 1), (0, 2), (2, 0)]
 
 class ImageAnalyzer:
     """Analyzes image properties and detects forgery indicators"""
     
     @staticmethod
-    def calculate_ela(image_path: str, quality: int = 90) -> np.ndarray:
-        """Calculate Error Level Analysis"""
-        img = Image.open(image_path)
+    @metrics.timed('ela')
+    def calculate_ela(image: Union[str, np.ndarray], quality: int = 90) -> np.ndarray:
+        """Calculate Error Level Analysis
+
+        Accepts an image path or an already decoded BGR array (as returned by
+        cv2). The recompression happens in an in-memory buffer, so concurrent
+        callers never share any file on disk.
+        """
+        if isinstance(image, np.ndarray):
+            if image.ndim == 2:
+                img = Image.fromarray(image)
+            else:
+                img = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        else:
+            img = Image.open(image)
         
         # Convert to RGB if needed
         if img.mode == 'RGBA':
             img = img.convert('RGB')
         
-        # Save with compression
-        temp_path = 'temp_ela.jpg'
-        img.save(temp_path, 'JPEG', quality=quality)
-        compressed = Image.open(temp_path)
+        # Compress in memory
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=quality)
+        buffer.seek(0)
+        compressed = Image.open(buffer)
         
         # Calculate difference
         original = np.array(img.convert('RGB'))
         comp = np.array(compressed.convert('RGB'))
         diff = np.abs(original.astype(int) - comp.astype(int))
         
-        # Clean up
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        
         return diff
     
     @staticmethod
+    @metrics.timed('dct')
     def detect_jpeg_artifacts(img: np.ndarray) -> float:
-        """Detect JPEG compression artifacts"""
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        dct = cv2.dct(np.float32(gray))
+        """Detect JPEG compression artifacts (accepts BGR or grayscale)
+        
+        Kept for models trained on it; analyze_dct_blocks is cheaper and
+        follows the JPEG block grid.
+        """
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        try:
+            dct = cv2.dct(np.float32(gray))
+        except cv2.error:
+            # OpenCV before 5.0 only transforms even sizes
+            dct = cv2.dct(np.float32(gray[:gray.shape[0] // 2 * 2, :gray.shape[1] // 2 * 2]))
         high_freq = np.abs(dct[dct.shape[0]//2:, dct.shape[1]//2:])
         return float(np.mean(high_freq))
     
     @staticmethod
+    @metrics.timed('block_dct')
+    def analyze_dct_blocks(gray_img: np.ndarray) -> dict:
+        """Compression statistics on the 8x8 JPEG block grid
+        
+        The image is cropped to whole blocks and every block is transformed
+        at once through strided views and two matrix products. Returns the
+        per-block high-frequency energy map (rows x cols of blocks) with
+        summary statistics, a double-compression score from the roughness of
+        low-frequency coefficient histograms, and blockiness at the grid and
+        at the strongest shifted grid.
+        """
+        rows, cols = gray_img.shape[0] // 8, gray_img.shape[1] // 8
+        if rows < 2 or cols < 2:
+            return {'block_energy': np.zeros((rows, cols)), 'high_freq': 0.0,
+                    'energy_std': 0.0, 'zero_ac': 0.0, 'double_compression': 0.0,
+                    'blockiness': 1.0, 'shifted_blockiness': 1.0}
+        
+        cropped = gray_img[:rows * 8, :cols * 8]
+        blocks = (cropped.astype(np.float32) - 128).reshape(rows, 8, cols, 8)
+        # D @ block @ D.T for every block as two matrix products; the result is
+        # (rows, cols, 64) with each block's coefficients transposed, which the
+        # symmetric statistics below do not depend on
+        partial = np.tensordot(blocks, _DCT_BASIS, axes=([3], [1]))
+        coeffs = np.abs(np.tensordot(partial, _DCT_BASIS, axes=([1], [1]))).reshape(rows, cols, 64)
+        
+        block_energy = coeffs @ _HIGH_FREQ_WEIGHTS
+        near_zero = np.count_nonzero(coeffs < 0.5) - np.count_nonzero(coeffs[..., 0] < 0.5)
+        zero_ac = near_zero / (coeffs.size - rows * cols)
+        double_compression = np.mean([ImageAnalyzer._histogram_roughness(coeffs[..., 8 * u + v].ravel())
+                                      for u, v in _DQ_MODES])
+        
+        # Summed absolute step between neighbours by position within the
+        # block; phase 7 crosses the grid
+        steps_x = cv2.absdiff(cropped[:, 1:], cropped[:, :-1]).sum(axis=0)
+        steps_y = cv2.absdiff(cropped[1:], cropped[:-1]).sum(axis=1)
+        phases = (steps_x[:cols * 8 - 8].reshape(cols - 1, 8).sum(axis=0) / ((cols - 1) * rows * 8)
+                  + steps_y[:rows * 8 - 8].reshape(rows - 1, 8).sum(axis=0) / ((rows - 1) * cols * 8))
+        inside = phases[:7].mean() + 1e-6
+        
+        return {
+            'block_energy': block_energy,
+            'high_freq': float(block_energy.mean()),
+            'energy_std': float(block_energy.std()),
+            'zero_ac': float(zero_ac),
+            'double_compression': float(double_compression),
+            'blockiness': float(phases[7] / inside),
+            'shifted_blockiness': float(phases[:7].max() / inside)
+        }
+    
+    @staticmethod
+    def _histogram_roughness(values: np.ndarray, bins: int = 16) -> float:
+        """Roughness of the histogram of quantized coefficient magnitudes (values >= 0)
+        
+        The quantization step is estimated as the largest period the
+        non-zero coefficients line up with. Recompressing with a different
+        step leaves periodic peaks and gaps in the histogram, whereas a
+        single compression gives a smooth decay.
+        """
+        magnitudes = np.round(values).astype(np.int64)
+        counts = np.bincount(magnitudes)
+        counts[0] = 0
+        if counts.sum() < 16:
+            return 0.0
+        steps = np.arange(1, 17)
+        levels = np.arange(len(counts))
+        alignment = np.cos(2 * np.pi * levels[None, :] / steps[:, None]) @ counts / counts.sum()
+        aligned = steps[alignment > 0.5]
+        step = aligned.max() if len(aligned) else 1
+        
+        levels = np.round(values[magnitudes >= 1] / step).astype(np.int64)
+        hist = np.bincount(levels[(levels >= 1) & (levels <= bins)], minlength=bins + 1)[1:]
+        if hist.sum() == 0:
+            return 0.0
+        return float(np.abs(np.diff(hist, 2)).sum() / hist.sum())
+    
+    @staticmethod
+    @metrics.timed('noise')
     def estimate_noise(gray_img: np.ndarray) -> float:
         """Estimate noise level in image using Laplacian"""
         h, w = gray_img.shape
@@ -52,6 +158,7 @@ class ImageAnalyzer:
         return float(sigma)
     
     @staticmethod
+    @metrics.timed('text_regions')
     def analyze_text_regions(gray_img: np.ndarray) -> dict:
         """Analyze text region properties"""
         _, binary = cv2.threshold(gray_img, 0, 255, 
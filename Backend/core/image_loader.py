@@ -1,11 +1,25 @@
+import csv
+import io
+import json
 import os
 import cv2
-from typing import List
+import numpy as np
+from PIL import Image
+from typing import Dict, Iterator, List, Tuple, Union
+from config.config import Config
+
+class ImageRejectedError(ValueError):
+    """Raised when an image header shows the image should not be decoded"""
+    
+    def to_dict(self) -> Dict:
+        return {'error': str(self)}
 
 class ImageLoader:
     """Handles loading images from folders and files"""
     
     VALID_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
+    # Pillow format names accepted for encoded image data
+    VALID_FORMATS = {'JPEG', 'PNG', 'BMP', 'TIFF'}
     
     @staticmethod
     def load_images_from_folder(folder_path: str) -> List[str]:
@@ -20,6 +34,67 @@ class ImageLoader:
         
         return image_paths
     
+    @staticmethod
+    def iter_images_from_folder(folder_path: str) -> Iterator[str]:
+        """Yield image paths from a folder in sorted (resumable) order"""
+        if not os.path.exists(folder_path):
+            raise FileNotFoundError(f"Folder not found: {folder_path}")
+        
+        with os.scandir(folder_path) as entries:
+            names = sorted(entry.name for entry in entries
+                           if entry.is_file() and ImageLoader._is_valid_image(entry.name))
+        for filename in names:
+            yield os.path.join(folder_path, filename)
+    
+    @staticmethod
+    def iter_images_recursive(folder_path: str) -> Iterator[str]:
+        """Yield image paths from a folder and all its subfolders, lazily
+        
+        Directories are scanned one at a time with os.scandir, so sharded
+        trees of any size are never listed in full. Each directory's images
+        come in sorted order before its subfolders.
+        """
+        if not os.path.isdir(folder_path):
+            raise FileNotFoundError(f"Folder not found: {folder_path}")
+        
+        pending = [folder_path]
+        while pending:
+            directory = pending.pop()
+            files, subfolders = [], []
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subfolders.append(entry.path)
+                    elif entry.is_file() and ImageLoader._is_valid_image(entry.name):
+                        files.append(entry.path)
+            yield from sorted(files)
+            pending.extend(sorted(subfolders, reverse=True))
+    
+    @staticmethod
+    def iter_manifest(manifest_path: str) -> Iterator[Tuple[str, int]]:
+        """Yield (path, label) pairs from a CSV or JSONL manifest
+        
+        CSV files need 'path' and 'label' columns; JSONL files hold one
+        {"path": ..., "label": ...} object per line. Labels are 1/real or
+        0/fake, and relative paths are resolved against the manifest folder.
+        """
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"Manifest not found: {manifest_path}")
+        
+        base_dir = os.path.dirname(os.path.abspath(manifest_path))
+        labels = {'1': 1, 'real': 1, '0': 0, 'fake': 0}
+        with open(manifest_path, newline='') as f:
+            if manifest_path.lower().endswith('.csv'):
+                rows = csv.DictReader(f)
+            else:
+                rows = (json.loads(line) for line in f if line.strip())
+            for line_number, row in enumerate(rows, 1):
+                label = labels.get(str(row.get('label')).strip().lower())
+                if label is None or not row.get('path'):
+                    raise ValueError(f"{manifest_path}: entry {line_number} needs a path "
+                                     f"and a label of 1/real or 0/fake")
+                yield os.path.join(base_dir, row['path']), label
+    
     @staticmethod
     def load_image(image_path: str):
         """Load a single image"""
@@ -27,6 +102,56 @@ class ImageLoader:
             raise FileNotFoundError(f"Image not found: {image_path}")
         return cv2.imread(image_path)
     
+    @staticmethod
+    def probe_image(data: bytes) -> Tuple[str, int, int]:
+        """Format, width and height read from the image header alone
+        
+        Raises ImageRejectedError for unrecognized formats and for images
+        over Config.MAX_IMAGE_PIXELS, before any pixel data is decoded.
+        """
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                image_format, (width, height) = img.format, img.size
+        except Image.DecompressionBombError:
+            raise ImageRejectedError("Image has too many pixels")
+        except (OSError, SyntaxError, ValueError):
+            raise ImageRejectedError("Unrecognized image format")
+        
+        if image_format not in ImageLoader.VALID_FORMATS:
+            raise ImageRejectedError(f"Unsupported image format: {image_format}")
+        if width <= 0 or height <= 0:
+            raise ImageRejectedError("Image has no pixels")
+        if width * height > Config.MAX_IMAGE_PIXELS:
+            raise ImageRejectedError(f"Image is {width}x{height}, more than "
+                                     f"{Config.MAX_IMAGE_PIXELS} pixels")
+        return image_format, width, height
+    
+    @staticmethod
+    def decode_image(data: bytes) -> np.ndarray:
+        """Decode raw encoded image bytes (e.g. an upload) into a BGR array
+        
+        The header is checked with probe_image first, so oversized images
+        are rejected without being decoded.
+        """
+        ImageLoader.probe_image(data)
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        img = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Could not decode image data")
+        return img
+    
+    @staticmethod
+    def to_array(image: Union[str, bytes, np.ndarray]) -> np.ndarray:
+        """Return a decoded BGR array for a path, raw bytes or decoded array"""
+        if isinstance(image, np.ndarray):
+            return image
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return ImageLoader.decode_image(image)
+        img = ImageLoader.load_image(image)
+        if img is None:
+            raise ValueError(f"Could not decode image: {image}")
+        return img
+    
     @staticmethod
     def _is_valid_image(filename: str) -> bool:
         """Check if file has valid image extension"""
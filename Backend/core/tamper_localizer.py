@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Tuple
+from core.feature_registry import FeatureContext
+from utils.metrics import metrics
+
+class TamperLocalizer:
+    """Scores a grid of tiles for signs of local editing
+
+    Works on the intermediates of an already prepared FeatureContext, so the
+    ELA image, grayscale and edge map computed for the features are reused.
+    Tile statistics come from integral images: one pass per signal map, then
+    four lookups per tile.
+    """
+
+    @staticmethod
+    def tile_means(values: np.ndarray, rows: int, cols: int) -> np.ndarray:
+        """Mean of a map over a rows x cols grid of (near) equal tiles
+        
+        Multi-channel maps give a (rows, cols, channels) result.
+        """
+        h, w = values.shape[:2]
+        if values.dtype not in (np.uint8, np.float32, np.float64):
+            values = values.astype(np.float32)
+        integral = cv2.integral(values, sdepth=cv2.CV_64F)
+        y = np.linspace(0, h, rows + 1).round().astype(int)
+        x = np.linspace(0, w, cols + 1).round().astype(int)
+        sums = (integral[np.ix_(y[1:], x[1:])] - integral[np.ix_(y[:-1], x[1:])]
+                - integral[np.ix_(y[1:], x[:-1])] + integral[np.ix_(y[:-1], x[:-1])])
+        areas = np.outer(np.diff(y), np.diff(x))
+        if sums.ndim == 3:
+            areas = areas[:, :, None]
+        return sums / np.maximum(areas, 1)
+    
+    @staticmethod
+    def _robust_z(values: np.ndarray) -> np.ndarray:
+        """Deviation from the median in units of the (scaled) median absolute deviation"""
+        median = np.median(values)
+        spread = 1.4826 * np.median(np.abs(values - median))
+        return (values - median) / (spread + 1e-6 * (abs(median) + 1))
+
+    @staticmethod
+    def _unexplained(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+        """Residual of a linear fit of tile values on tile edge density"""
+        if np.ptp(edges) == 0:
+            return values - values.mean()
+        slope, intercept = np.polyfit(edges.ravel(), values.ravel(), 1)
+        return values - (slope * edges + intercept)
+    
+    @staticmethod
+    def localize(context: FeatureContext, grid: Tuple[int, int] = (8, 12),
+                 top_k: int = 3) -> Dict:
+        """Heatmap of relative per-tile suspicion (0-1) and the top_k most suspicious tiles
+
+        A tile is suspicious when its ELA error is higher than its edge
+        density explains, or its noise level departs from what the rest of
+        the card shows at that edge density. Regions are given
+        in native image pixels.
+        """
+        with metrics.stage('localize'):
+            gray = context.get('gray')
+            rows, cols = min(grid[0], gray.shape[0]), min(grid[1], gray.shape[1])
+
+            # Error present in every channel; sharp colour edges mostly show
+            # chroma subsampling error in one or two
+            ela = TamperLocalizer.tile_means(context.get('ela'), rows, cols).min(axis=2)
+            noise = TamperLocalizer.tile_means(context.get('noise_residual'), rows, cols)
+            edges = TamperLocalizer.tile_means(context.get('edges'), rows, cols) / 255
+
+            # Text and borders raise both ELA and noise everywhere, so only the
+            # part edge density does not explain counts
+            ela_excess = TamperLocalizer._unexplained(ela, edges)
+            noise_excess = TamperLocalizer._unexplained(noise, edges)
+            
+            scores = (np.maximum(TamperLocalizer._robust_z(ela_excess), 0)
+                      + np.abs(TamperLocalizer._robust_z(noise_excess))) / 2
+            # Relative to the strongest tile, or to a clear outlier (six
+            # deviations) when no tile stands out
+            heatmap = scores / max(scores.max(), 6.0)
+            
+            native_h, native_w = context.get('native_size')
+            y = np.linspace(0, native_h, rows + 1).round().astype(int)
+            x = np.linspace(0, native_w, cols + 1).round().astype(int)
+            regions: List[Dict] = []
+            for index in np.argsort(heatmap, axis=None)[::-1][:top_k]:
+                r, c = divmod(int(index), cols)
+                regions.append({
+                    'x': int(x[c]), 'y': int(y[r]),
+                    'width': int(x[c + 1] - x[c]), 'height': int(y[r + 1] - y[r]),
+                    'score': round(float(heatmap[r, c]), 3),
+                    'ela': round(float(ela[r, c]), 3),
+                    'noise': round(float(noise[r, c]), 3),
+                    'edge_density': round(float(edges[r, c]), 3)
+                })
+
+        return {
+            'grid': [rows, cols],
+            'heatmap': np.round(heatmap, 3).tolist(),
+            'regions': regions
+        }
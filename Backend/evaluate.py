@@ -0,0 +1,74 @@
+"""
+Evaluation script comparing feature analysis resolutions
+Reports cross-validated accuracy and feature extraction time per image for
+native resolution and each downsampled analysis size, so the accuracy cost
+of the fast path can be judged before retraining with train.py --analysis-size
+
+Images are read from the same sources as train.py: the (nested) data
+folders or a --manifest.
+"""
+import argparse
+import time
+import numpy as np
+from core.feature_extractor import FeatureExtractor
+from core.image_loader import ImageLoader
+from services.detector_service import DetectorService
+from models import evaluation
+from config.config import Config
+from train import labeled_folders
+
+def extract_dataset(detector: DetectorService, labeled, total: int):
+    """Extract features for the labeled images, returning X, y and seconds per image"""
+    start = time.perf_counter()
+    X, y = detector._feature_matrix(labeled(), total)
+    elapsed = time.perf_counter() - start
+    return X, y, elapsed / max(1, total)
+
+def cross_validate(X: np.ndarray, y: np.ndarray, folds: int, threshold: float) -> float:
+    """Out-of-fold accuracy of MLModel over stratified k-fold splits"""
+    scores = evaluation.out_of_fold_scores(X, y, folds)
+    return evaluation.classification_metrics(y, scores, threshold)['accuracy']
+
+def main(sizes: list, folds: int, workers: int, manifest: str = None):
+    if manifest:
+        labeled = lambda: ImageLoader.iter_manifest(manifest)
+    else:
+        labeled = lambda: labeled_folders(Config.REAL_IMAGES_FOLDER, Config.FAKE_IMAGES_FOLDER)
+    try:
+        total = sum(1 for _ in labeled())
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        print("Add images to the real/fake data folders or pass --manifest")
+        return
+    if not total:
+        print("No images found; add images to the data folders or pass --manifest")
+        return
+    
+    # Features are always computed, so the timings are extraction times
+    detector = DetectorService(workers=workers, use_feature_cache=False)
+    
+    print("\n" + "="*60)
+    print("ANALYSIS RESOLUTION EVALUATION")
+    print("="*60)
+    print(f"{'Analysis size':<16}{'Accuracy':>12}{'ms / image':>14}")
+    
+    for size in [None] + sizes:
+        detector.feature_extractor = FeatureExtractor(analysis_size=size)
+        X, y, seconds = extract_dataset(detector, labeled, total)
+        accuracy = cross_validate(X, y, folds, Config.THRESHOLD)
+        label = str(size) if size else 'native'
+        print(f"{label:<16}{accuracy * 100:>11.2f}%{seconds * 1000:>14.1f}")
+    
+    print("="*60 + "\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare feature analysis resolutions")
+    parser.add_argument('sizes', nargs='*', type=int, default=[1024, 768, 512],
+                        help="Analysis sizes (longest side in pixels) to compare with native")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=Config.NUM_WORKERS)
+    parser.add_argument('--manifest', default=None,
+                        help="CSV (path,label columns) or JSONL manifest of images "
+                             "instead of the real/fake data folders")
+    args = parser.parse_args()
+    main(args.sizes, args.folds, args.workers, args.manifest)
@@ -0,0 +1,27 @@
+"""
+Export a trained (pickled) model to the compiled, pickle-free format
+The compiled file is memory-mapped on load and served without scikit-learn;
+point Config.MODEL_PATH (or predict.py's model_path) at it to use it
+"""
+import argparse
+import os
+from models.ml_model import MLModel
+from config.config import Config
+
+def main(model_path: str, output_path: str = None):
+    output_path = output_path or os.path.splitext(model_path)[0] + '.forest'
+    
+    ml_model = MLModel()
+    ml_model.load(model_path)
+    ml_model.export_compiled(output_path)
+    
+    print(f"Compiled model written to: {output_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a trained model to the compiled format")
+    parser.add_argument('model_path', nargs='?', default=Config.MODEL_PATH,
+                        help="Pickled model file (defaults to Config.MODEL_PATH)")
+    parser.add_argument('output_path', nargs='?', default=None,
+                        help="Compiled model file (defaults to <model>.forest)")
+    args = parser.parse_args()
+    main(args.model_path, args.output_path)
@@ -0,0 +1,96 @@
+import os
+import numpy as np
+from typing import Dict, List
+from core.feature_registry import CHEAP_FEATURE_NAMES
+from models.ml_model import MLModel
+
+class CascadeModel:
+    """First stage of a two-stage cascade classifier
+    
+    A small model on cheap features (dimensions, brightness/contrast,
+    colour histograms) decides the confidently real or fake cases; only
+    images it is unsure about go on to the full feature set and model.
+    """
+    
+    def __init__(self, confidence: float = 0.9):
+        # Probability (of either class) needed to decide without escalating
+        self.confidence = confidence
+        self.ml_model = MLModel()
+    
+    @property
+    def is_trained(self) -> bool:
+        return self.ml_model.is_trained
+    
+    @property
+    def feature_names(self) -> List[str]:
+        return self.ml_model.feature_config.get('feature_names', CHEAP_FEATURE_NAMES)
+    
+    @staticmethod
+    def cascade_path(model_path: str) -> str:
+        """Where the cascade stage of a model is stored: <model>_cascade<ext>"""
+        root, ext = os.path.splitext(model_path)
+        return f"{root}_cascade{ext}"
+    
+    @staticmethod
+    def cheap_columns(feature_names: List[str]) -> List[int]:
+        """Columns of the cheap features in a matrix with the given feature names"""
+        missing = [name for name in CHEAP_FEATURE_NAMES if name not in feature_names]
+        if missing:
+            raise ValueError(f"Cascade needs features that were not extracted: {', '.join(missing)}")
+        return [feature_names.index(name) for name in CHEAP_FEATURE_NAMES]
+    
+    def train(self, X: np.ndarray, y: np.ndarray, feature_names: List[str], feature_config: Dict):
+        """Train on the cheap columns of a full feature matrix"""
+        self.ml_model.train(X[:, self.cheap_columns(feature_names)], y)
+        self.ml_model.feature_config = dict(feature_config, feature_names=list(CHEAP_FEATURE_NAMES))
+    
+    def predict_proba(self, features: np.ndarray) -> float:
+        return self.ml_model.predict_proba(features)
+    
+    def is_confident(self, ml_score: float) -> bool:
+        """Whether the first stage may decide without escalating"""
+        return max(ml_score, 1 - ml_score) >= self.confidence
+    
+    def save(self, filepath: str):
+        self.ml_model.save(filepath)
+    
+    def load(self, filepath: str):
+        self.ml_model.load(filepath)
+    
+    @staticmethod
+    def evaluate(X: np.ndarray, y: np.ndarray, feature_names: List[str], threshold: float,
+                 confidences: List[float], folds: int = 5) -> List[Dict]:
+        """Escalation rate and accuracy of the cascade at several confidences
+        
+        Uses out-of-fold predictions of both stages, so every image is
+        scored by models that did not see it in training.
+        """
+        from sklearn.model_selection import StratifiedKFold
+        
+        folds = min(folds, int(np.bincount(y).min()))
+        if folds < 2:
+            raise ValueError("Cascade evaluation needs at least 2 images of each class")
+        
+        cheap = CascadeModel.cheap_columns(feature_names)
+        cheap_scores = np.zeros(len(y))
+        full_scores = np.zeros(len(y))
+        splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+        for train_idx, test_idx in splitter.split(X, y):
+            cheap_model, full_model = MLModel(), MLModel()
+            cheap_model.train(X[train_idx][:, cheap], y[train_idx])
+            full_model.train(X[train_idx], y[train_idx])
+            cheap_scores[test_idx] = cheap_model.predict_proba_batch(X[test_idx][:, cheap])
+            full_scores[test_idx] = full_model.predict_proba_batch(X[test_idx])
+        
+        full_accuracy = float(np.mean((full_scores >= threshold) == y))
+        report = []
+        for confidence in confidences:
+            escalate = np.maximum(cheap_scores, 1 - cheap_scores) < confidence
+            scores = np.where(escalate, full_scores, cheap_scores)
+            report.append({
+                'confidence': confidence,
+                'escalation_rate': float(np.mean(escalate)),
+                'accuracy': float(np.mean((scores >= threshold) == y)),
+                'full_model_accuracy': full_accuracy
+            })
+        return report
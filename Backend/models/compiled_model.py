@@ -0,0 +1,159 @@
+import json
+import os
+import struct
+import numpy as np
+from typing import Dict
+
+class CompiledModel:
+    """Pickle-free forest model evaluated with vectorized NumPy
+    
+    The scaler statistics and every tree of the forest are flattened into
+    contiguous arrays (split feature, threshold, children, leaf value) and
+    stored in one file that is memory-mapped on load, so worker processes
+    share the pages and start without importing scikit-learn. Predictions
+    match RandomForestClassifier.predict_proba on the same scaled input.
+    """
+    
+    MAGIC = b'AADHFRST'
+    VERSION = 1
+    ALIGNMENT = 64
+    
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict):
+        self.mean = arrays['mean']
+        self.scale = arrays['scale']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.max_depth = meta['max_depth']
+        self.feature_config = meta.get('feature_config', {})
+        self.decision_threshold = meta.get('decision_threshold')
+    
+    @classmethod
+    def from_sklearn(cls, model, scaler, feature_config: Dict = None,
+                     decision_threshold: float = None) -> 'CompiledModel':
+        """Flatten a fitted StandardScaler and RandomForestClassifier"""
+        positive = list(model.classes_).index(1)
+        n_features = model.n_features_in_
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+        
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left < 0
+            
+            # Leaf values as the normalized probability of the positive class
+            counts = tree.value[:, 0, :]
+            totals = counts.sum(axis=1)
+            totals[totals == 0] = 1
+            
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, -1, tree.children_left + offset))
+            rights.append(np.where(is_leaf, -1, tree.children_right + offset))
+            values.append(counts[:, positive] / totals)
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+        
+        arrays = {
+            'mean': np.asarray(mean, dtype=np.float64),
+            'scale': np.asarray(scale, dtype=np.float64),
+            'feature': np.concatenate(features).astype(np.int32),
+            'threshold': np.concatenate(thresholds).astype(np.float64),
+            'left': np.concatenate(lefts).astype(np.int32),
+            'right': np.concatenate(rights).astype(np.int32),
+            'value': np.concatenate(values).astype(np.float64),
+            'roots': np.array(roots, dtype=np.int32)
+        }
+        meta = {'max_depth': int(max_depth), 'feature_config': feature_config or {},
+                'decision_threshold': decision_threshold}
+        return cls(arrays, meta)
+    
+    def predict_proba_batch(self, X: np.ndarray) -> np.ndarray:
+        """Probability of the positive (real) class for an (N, n_features) matrix"""
+        X_scaled = (np.atleast_2d(X).astype(np.float64) - self.mean) / self.scale
+        # Trees compare float32 inputs against float64 thresholds, like sklearn
+        X_scaled = X_scaled.astype(np.float32).astype(np.float64)
+        
+        rows = np.arange(len(X_scaled))[:, None]
+        node = np.broadcast_to(self.roots, (len(X_scaled), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            left = self.left[node]
+            go_left = X_scaled[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(left < 0, node, np.where(go_left, left, self.right[node]))
+        
+        # Sum trees in order, as the forest does, to give identical results
+        leaf_values = self.value[node]
+        proba = np.zeros(len(X_scaled))
+        for t in range(leaf_values.shape[1]):
+            proba += leaf_values[:, t]
+        return proba / leaf_values.shape[1]
+    
+    def save(self, filepath: str):
+        """Write the model as a header followed by aligned raw arrays"""
+        arrays = {
+            'mean': self.mean, 'scale': self.scale, 'feature': self.feature,
+            'threshold': self.threshold, 'left': self.left, 'right': self.right,
+            'value': self.value, 'roots': self.roots
+        }
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            offset = self._align(offset)
+            layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += array.nbytes
+        header = json.dumps({
+            'version': self.VERSION,
+            'max_depth': self.max_depth,
+            'feature_config': self.feature_config,
+            'decision_threshold': self.decision_threshold,
+            'arrays': layout
+        }).encode()
+        data_start = self._align(len(self.MAGIC) + 4 + len(header))
+        
+        # Renamed into place: servers memory-mapping the previous file keep
+        # reading it, and a watcher never sees a partial file
+        temp_path = f"{filepath}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.replace(temp_path, filepath)
+    
+    @classmethod
+    def load(cls, filepath: str) -> 'CompiledModel':
+        """Memory-map a model written by save"""
+        with open(filepath, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"Not a compiled model file: {filepath}")
+            header_length, = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_length))
+        if header['version'] != cls.VERSION:
+            raise ValueError(f"Unsupported compiled model version: {header['version']}")
+        
+        data_start = cls._align(len(cls.MAGIC) + 4 + header_length)
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            arrays[name] = np.memmap(filepath, dtype=np.dtype(spec['dtype']), mode='r',
+                                     offset=data_start + spec['offset'],
+                                     shape=tuple(spec['shape']))
+        return cls(arrays, header)
+    
+    @classmethod
+    def is_compiled(cls, filepath: str) -> bool:
+        """Check whether a file is in the compiled format"""
+        with open(filepath, 'rb') as f:
+            return f.read(len(cls.MAGIC)) == cls.MAGIC
+    
+    @classmethod
+    def _align(cls, offset: int) -> int:
+        return -(-offset // cls.ALIGNMENT) * cls.ALIGNMENT
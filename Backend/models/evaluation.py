@@ -0,0 +1,66 @@
+import numpy as np
+from typing import Dict, List
+from models.ml_model import MLModel
+
+def out_of_fold_scores(X: np.ndarray, y: np.ndarray, folds: int = 5, n_jobs: int = -1,
+                       n_estimators: int = 100, random_state: int = 42) -> np.ndarray:
+    """Probability of being real for every sample from a model that did not train on it
+    
+    The folds are fitted in parallel, one single-threaded forest per fold.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+    
+    folds = min(folds, int(np.bincount(y, minlength=2).min()))
+    if folds < 2:
+        raise ValueError("Cross-validation needs at least 2 images of each class")
+    
+    def fit_fold(train_idx, test_idx):
+        model = MLModel(n_estimators=n_estimators, random_state=random_state, n_jobs=1)
+        model.train(X[train_idx], y[train_idx])
+        return test_idx, model.predict_proba_batch(X[test_idx])
+    
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+    fold_scores = Parallel(n_jobs=n_jobs)(
+        delayed(fit_fold)(train_idx, test_idx) for train_idx, test_idx in splitter.split(X, y))
+    
+    scores = np.zeros(len(y))
+    for test_idx, fold in fold_scores:
+        scores[test_idx] = fold
+    return scores
+
+def classification_metrics(y: np.ndarray, scores: np.ndarray, threshold: float) -> Dict:
+    """Accuracy, balanced accuracy and per-class precision/recall at a threshold"""
+    predicted = (scores >= threshold).astype(int)
+    metrics = {
+        'threshold': float(threshold),
+        'accuracy': float(np.mean(predicted == y))
+    }
+    recalls = []
+    for label, name in ((1, 'real'), (0, 'fake')):
+        actual = y == label
+        flagged = predicted == label
+        true_positives = np.sum(actual & flagged)
+        recall = float(true_positives / max(1, np.sum(actual)))
+        recalls.append(recall)
+        metrics[f'{name}_precision'] = float(true_positives / max(1, np.sum(flagged)))
+        metrics[f'{name}_recall'] = recall
+    metrics['balanced_accuracy'] = float(np.mean(recalls))
+    return metrics
+
+def threshold_sweep(y: np.ndarray, scores: np.ndarray,
+                    thresholds: np.ndarray = None) -> List[Dict]:
+    """classification_metrics for a range of thresholds"""
+    if thresholds is None:
+        thresholds = np.round(np.arange(0.05, 0.96, 0.01), 2)
+    return [classification_metrics(y, scores, t) for t in thresholds]
+
+def best_threshold(sweep: List[Dict]) -> float:
+    """Threshold with the highest balanced accuracy, nearest 0.5 on ties"""
+    best = max(sweep, key=lambda m: (m['balanced_accuracy'], -abs(m['threshold'] - 0.5)))
+    return best['threshold']
+
+def roc_auc(y: np.ndarray, scores: np.ndarray) -> float:
+    """Area under the ROC curve (probability a real card outscores a fake one)"""
+    from sklearn.metrics import roc_auc_score
+    return float(roc_auc_score(y, scores))
@@ -1,48 +1,148 @@
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
+import hashlib
+import os
 import pickle
 import numpy as np
+from models.compiled_model import CompiledModel
 
 class MLModel:
-    """Handles machine learning model training and prediction"""
+    """Handles machine learning model training and prediction
     
-    def __init__(self, n_estimators: int = 100, random_state: int = 42):
-        self.model = RandomForestClassifier(
-            n_estimators=n_estimators, 
-            random_state=random_state
-        )
-        self.scaler = StandardScaler()
+    scikit-learn is only imported when training or loading a pickled
+    model; a compiled model (see export_compiled) is served without it.
+    """
+    
+    def __init__(self, n_estimators: int = 100, random_state: int = 42, n_jobs: int = -1):
+        self.n_estimators = n_estimators
+        self.random_state = random_state
+        # Cores used for fitting; prediction stays single-threaded
+        self.n_jobs = n_jobs
+        self.model = None
+        self.scaler = None
+        self.compiled = None
         self.is_trained = False
+        # Content hash of the loaded model file (None for a freshly trained model)
+        self.version = None
+        # Decision threshold chosen from validation data, if any
+        self.threshold = None
+        # Feature extractor settings the model was trained with
+        self.feature_config = {}
     
     def train(self, X: np.ndarray, y: np.ndarray):
         """Train the ML model"""
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+        
+        self.model = RandomForestClassifier(
+            n_estimators=self.n_estimators, 
+            random_state=self.random_state,
+            n_jobs=self.n_jobs
+        )
+        self.scaler = StandardScaler()
+        self.compiled = None
+        self.version = None
         X_scaled = self.scaler.fit_transform(X)
         self.model.fit(X_scaled, y)
+        # Thread fan-out only costs latency when scoring a few images
+        self.model.set_params(n_jobs=None)
         self.is_trained = True
     
+    def grow(self, X: np.ndarray, y: np.ndarray, n_new_trees: int):
+        """Add n_new_trees trees fitted on X, keeping the existing ones
+        
+        The scaler is kept as fitted originally, since the existing trees
+        split on features scaled by it.
+        """
+        if self.model is None:
+            raise Exception("Only trained or pickled models can be grown")
+        
+        X_scaled = self.scaler.transform(X)
+        self.model.set_params(warm_start=True, n_jobs=self.n_jobs,
+                              n_estimators=self.model.n_estimators + n_new_trees)
+        self.model.fit(X_scaled, y)
+        self.model.set_params(warm_start=False, n_jobs=None)
+        self.n_estimators = self.model.n_estimators
+        self.compiled = None
+        self.version = None
+    
     def predict_proba(self, features: np.ndarray) -> float:
         """Predict probability of being real"""
         if not self.is_trained:
             raise Exception("Model not trained yet")
         
-        features_scaled = self.scaler.transform(features.reshape(1, -1))
-        return float(self.model.predict_proba(features_scaled)[0][1])
+        return float(self.predict_proba_batch(features.reshape(1, -1))[0])
+    
+    def predict_proba_batch(self, X: np.ndarray) -> np.ndarray:
+        """Predict probability of being real for an (N, n_features) matrix"""
+        if not self.is_trained:
+            raise Exception("Model not trained yet")
+        
+        if self.compiled is not None:
+            return self.compiled.predict_proba_batch(X)
+        
+        X_scaled = self.scaler.transform(np.atleast_2d(X))
+        return self.model.predict_proba(X_scaled)[:, 1]
+    
+    def feature_importances(self) -> np.ndarray:
+        """Impurity-based importance of each input feature"""
+        if self.model is None:
+            raise Exception("Feature importances need a trained or pickled model")
+        return self.model.feature_importances_
+    
+    def export_compiled(self, filepath: str):
+        """Export the trained model in the pickle-free compiled format"""
+        if not self.is_trained:
+            raise Exception("Model not trained yet")
+        
+        compiled = self.compiled or CompiledModel.from_sklearn(
+            self.model, self.scaler, self.feature_config, self.threshold)
+        compiled.save(filepath)
     
     def save(self, filepath: str):
         """Save model to file"""
+        if self.model is None:
+            raise Exception("Only trained or pickled models can be saved; "
+                            "compiled models are written with export_compiled")
         model_data = {
             'model': self.model,
             'scaler': self.scaler,
-            'is_trained': self.is_trained
+            'is_trained': self.is_trained,
+            'feature_config': self.feature_config,
+            'threshold': self.threshold
         }
-        with open(filepath, 'wb') as f:
+        # Renamed into place, so a server watching filepath never reads a partial file
+        temp_path = f"{filepath}.tmp"
+        with open(temp_path, 'wb') as f:
             pickle.dump(model_data, f)
+        os.replace(temp_path, filepath)
+    
+    @staticmethod
+    def file_version(filepath: str) -> str:
+        """Short content hash identifying a model file"""
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()[:12]
     
     def load(self, filepath: str):
-        """Load model from file"""
+        """Load model from file (pickled or compiled format)"""
+        self.version = self.file_version(filepath)
+        if CompiledModel.is_compiled(filepath):
+            self.compiled = CompiledModel.load(filepath)
+            self.model = None
+            self.scaler = None
+            self.is_trained = True
+            self.feature_config = self.compiled.feature_config
+            self.threshold = self.compiled.decision_threshold
+            return
+        
+        self.compiled = None
         with open(filepath, 'rb') as f:
             model_data = pickle.load(f)
         
         self.model = model_data['model']
         self.scaler = model_data['scaler']
-        self.is_trained = model_data['is_trained']
\ No newline at end of file
+        self.is_trained = model_data['is_trained']
+        self.feature_config = model_data.get('feature_config', {})
+        self.threshold = model_data.get('threshold')
+        self.n_estimators = self.model.n_estimators
\ No newline at end of file
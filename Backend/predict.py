@@ -1,7 +1,7 @@
 """
 Prediction script for single image or batch prediction
 """
-import sys
+import argparse
 from services.detector_service import DetectorService
 from config.config import Config
 
@@ -33,17 +33,25 @@ def predict_single(image_path: str, model_path: str = None):
     
     return result
 
-def predict_batch(folder_path: str, model_path: str = None):
-    """Predict on all images in a folder"""
+def predict_batch(folder_path: str, model_path: str = None, output_path: str = None,
+                  resume: bool = False):
+    """Predict on all images in a folder
+    
+    With output_path, results are streamed to a JSONL/CSV file instead of
+    being collected in memory, and resume skips images already in it.
+    """
     # Initialize detector
-    detector = DetectorService()
+    detector = DetectorService(use_feature_cache=True)
     
     # Load model
     model_path = model_path or Config.MODEL_PATH
     detector.load_model(model_path)
     
     # Batch predict
-    report = detector.predict_batch(folder_path)
+    if output_path:
+        report = detector.predict_batch_to_file(folder_path, output_path, resume=resume)
+    else:
+        report = detector.predict_batch(folder_path)
     
     # Display summary
     print("\n" + "="*80)
@@ -56,8 +64,11 @@ def predict_batch(folder_path: str, model_path: str = None):
     print(f"Average Score: {report['avg_score']:.2f}%")
     print("="*80)
     
+    if output_path:
+        print(f"\nResults written to: {output_path}")
+    
     # List fake cards
-    if report['fake_count'] > 0:
+    elif report['fake_count'] > 0:
         print("\n🚫 FAKE CARDS DETECTED:")
         for r in report['results']:
             if r['prediction'] == 'FAKE':
@@ -67,17 +78,23 @@ def predict_batch(folder_path: str, model_path: str = None):
     return report
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage:")
-        print("  Single prediction: python predict.py <image_path> [model_path]")
-        print("  Batch prediction: python predict.py --batch <folder_path> [model_path]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Predict whether Aadhaar card images are real or fake")
+    parser.add_argument('path', help="Image path, or folder path with --batch")
+    parser.add_argument('model_path', nargs='?', default=None,
+                        help="Model file (defaults to Config.MODEL_PATH)")
+    parser.add_argument('--batch', action='store_true',
+                        help="Predict on every image in a folder")
+    parser.add_argument('--output',
+                        help="Stream batch results to this .jsonl or .csv file")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip images already scored in the --output file")
+    args = parser.parse_args()
+    
+    if args.resume and not args.output:
+        parser.error("--resume requires --output")
     
-    if sys.argv[1] == '--batch':
-        folder = sys.argv[2]
-        model = sys.argv[3] if len(sys.argv) > 3 else None
-        predict_batch(folder, model)
+    if args.batch:
+        predict_batch(args.path, args.model_path, args.output, args.resume)
     else:
-        image = sys.argv[1]
-        model = sys.argv[2] if len(sys.argv) > 2 else None
-        predict_single(image, model)
\ No newline at end of file
+        predict_single(args.path, args.model_path)
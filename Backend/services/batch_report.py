@@ -0,0 +1,50 @@
+from typing import Dict, List
+
+class BatchReport:
+    """Running aggregates for a batch prediction summary
+    
+    Results are folded in one at a time, so a summary can be produced
+    without keeping every result in memory.
+    """
+    
+    def __init__(self):
+        self.total = 0
+        self.real_count = 0
+        self.fake_count = 0
+        self.uncertain_count = 0
+        self.score_sum = 0.0
+    
+    def add(self, result: Dict):
+        """Fold one prediction result into the aggregates"""
+        self.total += 1
+        if result['prediction'] == 'REAL':
+            self.real_count += 1
+        elif result['prediction'] == 'FAKE':
+            self.fake_count += 1
+        if result['uncertain']:
+            self.uncertain_count += 1
+        self.score_sum += result['authenticity_score']
+    
+    def to_dict(self, results: List[Dict] = None) -> Dict:
+        """Summary in the same shape as DetectorService._generate_report"""
+        results = results if results is not None else []
+        if not self.total:
+            return {
+                'total': 0,
+                'real_count': 0,
+                'fake_count': 0,
+                'uncertain_count': 0,
+                'avg_score': 0.0,
+                'results': results
+            }
+        
+        return {
+            'total': self.total,
+            'real_count': self.real_count,
+            'fake_count': self.fake_count,
+            'uncertain_count': self.uncertain_count,
+            'avg_score': float(self.score_sum / self.total),
+            'fake_percentage': float(self.fake_count / self.total * 100),
+            'real_percentage': float(self.real_count / self.total * 100),
+            'results': results
+        }
@@ -1,63 +1,461 @@
 import os
+import random
+import tempfile
+from itertools import islice
 import numpy as np
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from core.image_loader import ImageLoader
-from core.feature_extractor import FeatureExtractor
+from core.feature_extractor import ExtractionPool, FeatureExtractor
+from core.feature_cache import FeatureCache
+from core.feature_registry import feature_cost
+from core.tamper_localizer import TamperLocalizer
 from models.ml_model import MLModel
+from models.cascade_model import CascadeModel
+from models import evaluation
+from services.batch_report import BatchReport
+from services.preflight import Preflight
+from utils.result_writer import ResultWriter
+from utils.helpers import print_training_summary
+from utils.metrics import metrics
 from config.config import Config
 
 class DetectorService:
     """Main detector service - handles all detection operations"""
     
-    def __init__(self, threshold: float = None):
+    def __init__(self, threshold: float = None, workers: int = None,
+                 use_feature_cache: bool = False, analysis_size: int = None):
         self.threshold = threshold or Config.THRESHOLD
+        # Without an explicit threshold, the one stored with the model is used
+        self._fixed_threshold = threshold is not None
+        self.workers = workers or Config.NUM_WORKERS
+        self.use_feature_cache = use_feature_cache
         self.image_loader = ImageLoader()
-        self.feature_extractor = FeatureExtractor()
+        self.feature_extractor = FeatureExtractor(analysis_size or Config.ANALYSIS_SIZE)
         self.ml_model = MLModel()
+        # Optional shared MicroBatcher used by predict instead of scoring inline
+        self.batcher = None
+        # Optional ResultCache consulted for uploaded bytes before predicting
+        self.result_cache = None
+        # Optional first cascade stage deciding easy cases on cheap features
+        self.cascade = None
+        # Cheap checks rejecting non-card images before feature extraction
+        self.preflight = Preflight() if Config.PREFLIGHT_ENABLED else None
+        self._feature_cache = None
     
-    def train(self, real_images_paths: List[str], fake_images_paths: List[str]):
-        """Train the detector on real and fake images"""
-        X = []
-        y = []
+    def train(self, real_images_paths: List[str], fake_images_paths: List[str],
+              prune_below: float = None, cascade: bool = False, folds: int = None,
+              grow_trees: int = None) -> Dict:
+        """Train the detector on lists of real and fake images (see train_labeled)"""
+        labeled = [(path, 1) for path in real_images_paths] + [(path, 0) for path in fake_images_paths]
+        return self.train_labeled(lambda: iter(labeled), prune_below=prune_below,
+                                  cascade=cascade, folds=folds, grow_trees=grow_trees)
+    
+    def train_labeled(self, labeled: Callable[[], Iterable[Tuple[str, int]]],
+                      max_per_class: int = None, prune_below: float = None,
+                      cascade: bool = False, folds: int = None, grow_trees: int = None,
+                      seed: int = 42) -> Dict:
+        """Train the detector on (path, label) pairs, 1 for real and 0 for fake
+        
+        labeled is called once per pass, so it can stream from a directory
+        walk or manifest. Returns the cross-validation metrics (empty without
+        folds); a model grown by grow_trees keeps its threshold.
+        """
+        if grow_trees and (prune_below or cascade):
+            raise ValueError("Growing a loaded model cannot be combined with pruning or a cascade")
+        if grow_trees and self.ml_model.model is None:
+            raise ValueError("Load a pickled model before growing it (compiled models cannot grow)")
         
-        print(f"Training on {len(real_images_paths)} real and "
-              f"{len(fake_images_paths)} fake images...")
+        if max_per_class:
+            sample = self._stratified_sample(labeled(), max_per_class, seed)
+            labeled = lambda: iter(sample)
         
-        # Process real images
-        print("Processing real images...")
-        for img_path in real_images_paths:
-            features = self.feature_extractor.extract_features(img_path)
-            X.append(features)
-            y.append(1)
+        counts = [0, 0]
+        for _, label in labeled():
+            counts[label] += 1
+        if not all(counts):
+            raise ValueError(f"Training needs both real and fake images, found "
+                             f"{counts[1]} real and {counts[0]} fake")
+        print_training_summary(counts[1], counts[0])
         
-        # Process fake images
-        print("Processing fake images...")
-        for img_path in fake_images_paths:
-            features = self.feature_extractor.extract_features(img_path)
-            X.append(features)
-            y.append(0)
+        X, y = self._feature_matrix(labeled(), sum(counts))
         
         # Train model
-        X = np.array(X)
-        y = np.array(y)
-        self.ml_model.train(X, y)
+        if cascade:
+            self._train_cascade(X, y)
+        
+        if grow_trees:
+            print(f"Growing the loaded model by {grow_trees} trees...")
+            self.ml_model.grow(X, y, grow_trees)
+        else:
+            self.ml_model.train(X, y)
+            if prune_below:
+                X = self._prune_features(X, y, prune_below)
+            self.ml_model.feature_config = self.feature_extractor.config
+        
+        # Cross-validation trains fresh forests, which say nothing about a
+        # grown one, so a grown model keeps its threshold
+        if folds and grow_trees:
+            print("Skipping cross-validation for a grown model")
+        training_metrics = self._cross_validate(X, y, folds) if folds and not grow_trees else {}
         
         print("Training completed successfully!")
+        return training_metrics
+    
+    @staticmethod
+    def _stratified_sample(labeled: Iterable[Tuple[str, int]], per_class: int,
+                           seed: int) -> List[Tuple[str, int]]:
+        """Uniform sample of at most per_class items of each label, in one pass"""
+        rng = random.Random(seed)
+        reservoirs, seen = {0: [], 1: []}, {0: 0, 1: 0}
+        for item in labeled:
+            label = item[1]
+            seen[label] += 1
+            if len(reservoirs[label]) < per_class:
+                reservoirs[label].append(item)
+            else:
+                slot = rng.randrange(seen[label])
+                if slot < per_class:
+                    reservoirs[label][slot] = item
+        print(f"Sampled {len(reservoirs[1])} of {seen[1]} real and "
+              f"{len(reservoirs[0])} of {seen[0]} fake images")
+        return reservoirs[1] + reservoirs[0]
+    
+    def _feature_matrix(self, labeled: Iterable[Tuple[str, int]],
+                        total: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Extract features chunk by chunk into a float32 matrix, skipping failures
+        
+        At most total images are used; images that appeared after they
+        were counted are left out.
+        """
+        shape = (total, len(self.feature_extractor.feature_names))
+        if total * shape[1] * 4 > Config.TRAINING_MEMMAP_BYTES:
+            # Backed by an anonymous temporary file, removed once released
+            X = np.memmap(tempfile.TemporaryFile(), dtype=np.float32, mode='w+', shape=shape)
+        else:
+            X = np.empty(shape, dtype=np.float32)
+        y = np.empty(total, dtype=np.int8)
+        
+        filled = processed = 0
+        labeled = iter(labeled)
+        # One set of workers for all chunks
+        with ExtractionPool(self.feature_extractor, self.workers) as pool:
+            for chunk in self._chunks(islice(labeled, total), Config.BATCH_CHUNK_SIZE):
+                paths = [path for path, _ in chunk]
+                extracted = self._extract_many(paths, self.workers, flush=False, pool=pool)
+                for (path, label), (features, error) in zip(chunk, extracted):
+                    if error is not None:
+                        print(f"Error processing {os.path.basename(path)}: {error}")
+                        continue
+                    X[filled] = features
+                    y[filled] = label
+                    filled += 1
+                processed += len(chunk)
+                if processed % Config.FEATURE_CACHE_FLUSH_EVERY < len(chunk):
+                    self._flush_feature_cache()
+                print(f"Processed {processed}/{total} images")
+        
+        skipped = sum(1 for _ in labeled)
+        if skipped:
+            print(f"Skipped {skipped} images added after the training images were counted")
+        
+        self._flush_feature_cache()
+        return X[:filled], y[:filled]
+    
+    @staticmethod
+    def _chunks(items: Iterable, size: int) -> Iterator[List]:
+        """Consecutive lists of up to size items"""
+        chunk = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def _cross_validate(self, X: np.ndarray, y: np.ndarray, folds: int) -> Dict:
+        """Evaluate the model out-of-fold and choose its decision threshold"""
+        print(f"Cross-validating over {folds} folds...")
+        scores = evaluation.out_of_fold_scores(X, y, folds,
+                                               n_estimators=self.ml_model.n_estimators,
+                                               random_state=self.ml_model.random_state)
+        sweep = evaluation.threshold_sweep(y, scores)
+        threshold = evaluation.best_threshold(sweep)
+        
+        self.ml_model.threshold = threshold
+        if not self._fixed_threshold:
+            self.threshold = threshold
+        
+        chosen = evaluation.classification_metrics(y, scores, threshold)
+        default = evaluation.classification_metrics(y, scores, Config.THRESHOLD)
+        print(f"Threshold {Config.THRESHOLD:.2f}: accuracy {default['accuracy'] * 100:.1f}%, "
+              f"balanced {default['balanced_accuracy'] * 100:.1f}%")
+        print(f"Threshold {threshold:.2f}: accuracy {chosen['accuracy'] * 100:.1f}%, "
+              f"balanced {chosen['balanced_accuracy'] * 100:.1f}% (chosen)")
+        
+        return {
+            'folds': folds,
+            'samples': {'real': int(np.sum(y == 1)), 'fake': int(np.sum(y == 0))},
+            'roc_auc': evaluation.roc_auc(y, scores),
+            'threshold': threshold,
+            'chosen': chosen,
+            'default': default,
+            'sweep': sweep
+        }
+    
+    def _train_cascade(self, X: np.ndarray, y: np.ndarray):
+        """Report the cascade trade-off and train its first stage"""
+        names = list(self.feature_extractor.feature_names)
+        report = CascadeModel.evaluate(X, y, names, self.threshold,
+                                       Config.CASCADE_REPORT_CONFIDENCES)
+        
+        print("\nCascade evaluation (out-of-fold):")
+        print(f"{'Confidence':>12}{'Escalated':>12}{'Accuracy':>12}{'Full model':>12}")
+        for row in report:
+            print(f"{row['confidence']:>12.2f}{row['escalation_rate'] * 100:>11.1f}%"
+                  f"{row['accuracy'] * 100:>11.1f}%{row['full_model_accuracy'] * 100:>11.1f}%")
+        print()
+        
+        self.cascade = CascadeModel(Config.CASCADE_CONFIDENCE)
+        self.cascade.train(X, y, names, self.feature_extractor.config)
+    
+    def _prune_features(self, X: np.ndarray, y: np.ndarray, min_importance: float) -> np.ndarray:
+        """Retrain on the features at least min_importance important, returning their columns"""
+        names = self.feature_extractor.feature_names
+        importances = self.ml_model.feature_importances()
+        keep = [i for i, importance in enumerate(importances) if importance >= min_importance]
+        if not keep or len(keep) == len(names):
+            print("Feature pruning: keeping all features")
+            return X
+        
+        kept_names = [names[i] for i in keep]
+        for i, name in enumerate(names):
+            if i not in keep:
+                print(f"Pruning feature {name} (importance {importances[i]:.4f})")
+        print(f"Feature pruning: {len(names)} -> {len(kept_names)} features, "
+              f"relative cost {feature_cost(names):.1f} -> {feature_cost(kept_names):.1f}")
+        
+        self.ml_model.train(X[:, keep], y)
+        self.feature_extractor.feature_names = kept_names
+        return X[:, keep]
+    
+    def _extract_many(self, images: List[Union[str, bytes, np.ndarray]], workers: int,
+                      flush: bool = True, preflight: Preflight = None,
+                      cascade: CascadeModel = None, pool: ExtractionPool = None
+                      ) -> List[Tuple[Optional[np.ndarray], Optional[Union[str, Dict]]]]:
+        """Extract features, only computing images missing from the feature cache
+        
+        Without flush, new cache entries stay pending until _flush_feature_cache.
+        A preflight checks the images that are computed (see
+        FeatureExtractor.extract_many); cached features were extracted once
+        already and are used as they are. With a cascade, results are
+        (first stage score, full features or None) pairs. A pool, kept for
+        a whole run, must be set up with the same preflight and cascade.
+        """
+        if pool is None:
+            pool = ExtractionPool(self.feature_extractor, min(workers, len(images)),
+                                  preflight, cascade)
+            try:
+                return self._extract_many(images, workers, flush, preflight, cascade, pool)
+            finally:
+                pool.close()
+        
+        cache = self._get_feature_cache()
+        if cache is None:
+            return pool.map(images)
+        
+        # Cached full feature vectors hold the first stage's features too,
+        # unless pruning dropped some of them
+        names = self.feature_extractor.feature_names
+        cheap_columns = None
+        if cascade is not None and set(cascade.feature_names) <= set(names):
+            cheap_columns = [names.index(name) for name in cascade.feature_names]
+        
+        extracted = [None] * len(images)
+        keys, missing = [None] * len(images), []
+        for i, image in enumerate(images):
+            try:
+                if isinstance(image, str):
+                    keys[i] = cache.hash_file(image)
+                elif isinstance(image, (bytes, bytearray, memoryview)):
+                    keys[i] = cache.hash_bytes(image)
+            except OSError as e:
+                extracted[i] = (None, str(e))
+                continue
+            features = cache.get(keys[i]) if keys[i] else None
+            if features is None or (cascade is not None and cheap_columns is None):
+                missing.append(i)
+            elif cascade is not None:
+                cheap_score = cascade.predict_proba(features[cheap_columns])
+                extracted[i] = ((cheap_score, None if cascade.is_confident(cheap_score)
+                                 else features), None)
+            else:
+                extracted[i] = (features, None)
+        
+        if len(missing) < len(images):
+            print(f"Feature cache: {len(images) - len(missing)} of {len(images)} images cached")
+        
+        computed = pool.map([images[i] for i in missing])
+        for i, (features, error) in zip(missing, computed):
+            extracted[i] = (features, error)
+            full_features = features[1] if cascade is not None and error is None else features
+            if error is None and keys[i] and full_features is not None:
+                cache.put(keys[i], full_features)
+        
+        if flush:
+            cache.flush()
+        return extracted
     
-    def predict(self, image_path: str) -> Dict:
-        """Predict if an Aadhaar card is real or fake"""
+    def _flush_feature_cache(self):
+        """Write pending feature cache entries, if caching is enabled"""
+        if self._feature_cache is not None:
+            self._feature_cache.flush()
+    
+    def _get_feature_cache(self) -> Optional[FeatureCache]:
+        """Open (or reopen after the extractor changed) the feature cache"""
+        if not self.use_feature_cache:
+            return None
+        version = self.feature_extractor.version
+        if self._feature_cache is None or self._feature_cache.version != version:
+            self._feature_cache = FeatureCache(Config.FEATURE_CACHE_DIR, version,
+                                               Config.FEATURE_CACHE_MAX_ENTRIES)
+        return self._feature_cache
+    
+    def predict(self, image: Union[str, bytes, np.ndarray], localize: bool = False) -> Dict:
+        """Predict if an Aadhaar card is real or fake
+        
+        Accepts an image path, raw encoded bytes or a decoded BGR array.
+        With localize, the result also holds a tile heatmap and the most
+        suspicious regions (see TamperLocalizer). Raises PreflightError for
+        images that cannot be a card.
+        """
+        if not self.ml_model.is_trained:
+            raise Exception("Model not trained. Load a trained model first.")
+        
+        # Localized results are not cached, so they never stand in for plain ones
+        cache_keys = None if localize else self._result_cache_keys(image)
+        if cache_keys:
+            cached = self.result_cache.get(cache_keys)
+            if cached is not None:
+                cached['cached'] = True
+                return cached
+        
+        if self.preflight is not None:
+            image = self.preflight.check(image)
+        
+        context = self.feature_extractor.prepare(image)
+        ml_score, cascade_stage = None, None
+        if self.cascade is not None:
+            # Cheap features first; the full set only when the cascade is unsure
+            cheap_features = self.feature_extractor.compute(context, self.cascade.feature_names)
+            with metrics.stage('cascade_model'):
+                cheap_score = self.cascade.predict_proba(cheap_features)
+            if self.cascade.is_confident(cheap_score):
+                ml_score, cascade_stage = cheap_score, 'cheap'
+            else:
+                features = self.feature_extractor.compute(context, self.feature_extractor.feature_names)
+                cascade_stage = 'full'
+        else:
+            # Extract features and predict
+            features = self.feature_extractor.compute(context, self.feature_extractor.feature_names)
+        
+        if ml_score is None:
+            with metrics.stage('model'):
+                if self.batcher is not None:
+                    ml_score = self.batcher.score(features).result(timeout=Config.REQUEST_TIMEOUT)
+                else:
+                    ml_score = self.ml_model.predict_proba(features)
+        
+        result = self._build_result(ml_score)
+        if cascade_stage:
+            result['cascade_stage'] = cascade_stage
+        if localize:
+            result['localization'] = TamperLocalizer.localize(context, Config.LOCALIZATION_GRID,
+                                                              Config.LOCALIZATION_TOP_K)
+        if cache_keys:
+            self.result_cache.set(cache_keys, result)
+        return result
+    
+    def _result_cache_keys(self, image) -> Optional[List[str]]:
+        """Result cache keys for uploaded bytes, None when caching does not apply"""
+        if (self.result_cache is None or self.ml_model.version is None
+                or not isinstance(image, (bytes, bytearray))):
+            return None
+        with metrics.stage('result_cache'):
+            return self.result_cache.keys_for(bytes(image), self.model_version,
+                                              self.threshold)
+    
+    @property
+    def model_version(self) -> Optional[str]:
+        """Version of the loaded model, including its cascade stage if any"""
+        if self.cascade is not None and self.ml_model.version:
+            return f"{self.ml_model.version}+{self.cascade.ml_model.version}"
+        return self.ml_model.version
+    
+    def predict_many(self, images: List[Union[str, bytes, np.ndarray]],
+                     workers: int = 1, flush: bool = True,
+                     pool: ExtractionPool = None) -> List[Dict]:
+        """Predict on several images, scoring all feature vectors in one call
+        
+        Returns one result per input, in order. Images failing preflight or
+        whose features could not be extracted get a dict with an 'error' key
+        instead. With workers > 1 feature extraction is spread over a
+        process pool. Without flush, new feature cache entries stay pending
+        until _flush_feature_cache. A cascade is applied as in predict. A
+        pool from _extraction_pool is reused instead of starting workers.
+        """
         if not self.ml_model.is_trained:
             raise Exception("Model not trained. Load a trained model first.")
         
-        # Extract features and predict
-        features = self.feature_extractor.extract_features(image_path)
-        ml_score = self.ml_model.predict_proba(features)
+        results = [None] * len(images)
+        cache_keys = [self._result_cache_keys(image) for image in images]
+        for i, keys in enumerate(cache_keys):
+            cached = self.result_cache.get(keys) if keys else None
+            if cached is not None:
+                cached['cached'] = True
+                results[i] = cached
         
+        pending = [i for i, result in enumerate(results) if result is None]
+        features, indices = [], []
+        decided = {}
+        # Preflight and the cascade's first stage run inside the extraction
+        # workers, on the image they decode
+        extracted = self._extract_many([images[i] for i in pending], workers, flush,
+                                       self.preflight, self.cascade, pool)
+        for i, (image_features, error) in zip(pending, extracted):
+            if error is not None:
+                results[i] = error if isinstance(error, dict) else {'error': error}
+                continue
+            if self.cascade is not None:
+                cheap_score, image_features = image_features
+                if image_features is None:
+                    decided[i] = cheap_score
+                    continue
+            features.append(image_features)
+            indices.append(i)
+        
+        scores = {}
+        if features:
+            with metrics.stage('model'):
+                scores = dict(zip(indices, self.ml_model.predict_proba_batch(np.array(features))))
+        for i, ml_score in {**decided, **scores}.items():
+            results[i] = self._build_result(float(ml_score))
+            if self.cascade is not None:
+                results[i]['cascade_stage'] = 'cheap' if i in decided else 'full'
+            if cache_keys[i]:
+                self.result_cache.set(cache_keys[i], results[i])
+        
+        return results
+    
+    def _build_result(self, ml_score: float) -> Dict:
+        """Turn a model probability into a prediction result"""
         # Convert to percentage
         authenticity_score = ml_score * 100
         
         # Classify
-        prediction = "REAL" if ml_score >= self.threshold else "Manual Review" if 0.40 <= ml_score < 0.45 else "FAKE"
+        # Scores just below the threshold go to manual review
+        review_from = self.threshold - Config.MANUAL_REVIEW_MARGIN
+        prediction = "REAL" if ml_score >= self.threshold else "Manual Review" if review_from <= ml_score < self.threshold else "FAKE"
         is_uncertain = abs(ml_score - self.threshold) < 0.1
         
         return {
@@ -77,50 +475,115 @@ class DetectorService:
         
         print(f"Processing {len(image_paths)} images...")
         
-        for img_path in image_paths:
-            try:
-                result = self.predict(img_path)
-                result['image_path'] = img_path
-                result['image_name'] = os.path.basename(img_path)
-                results.append(result)
-            except Exception as e:
-                print(f"Error processing {os.path.basename(img_path)}: {e}")
+        for result in self._iter_predictions(image_paths):
+            if 'error' in result:
+                print(f"Error processing {result['image_name']}: {result['error']}")
+                continue
+            results.append(result)
         
         return self._generate_report(results)
     
+    def iter_predict_batch(self, image_folder: str, skip: Set[str] = None,
+                           chunk_size: int = None) -> Iterator[Dict]:
+        """Yield results for all images in a folder as they complete
+        
+        Images are scored chunk by chunk, so memory stays bounded however
+        large the folder is. Paths in skip are not scored again. Failed
+        images are yielded with an 'error' key.
+        """
+        if not self.ml_model.is_trained:
+            raise Exception("Model not trained. Load a trained model first.")
+        
+        image_paths = (p for p in self.image_loader.iter_images_from_folder(image_folder)
+                       if not skip or p not in skip)
+        yield from self._iter_predictions(image_paths, chunk_size)
+    
+    def predict_batch_to_file(self, image_folder: str, output_path: str,
+                              resume: bool = False) -> Dict:
+        """Stream batch predictions into a JSONL or CSV file
+        
+        Results are appended as they complete and only running aggregates
+        are kept in memory. With resume, images already scored in
+        output_path are skipped and counted towards the summary.
+        """
+        report = BatchReport()
+        done = set()
+        if resume:
+            for result in ResultWriter.read_results(output_path):
+                if 'error' not in result:
+                    done.add(result['image_path'])
+                    report.add(result)
+            print(f"Resuming: {len(done)} images already scored")
+        elif os.path.exists(output_path):
+            os.remove(output_path)
+        
+        processed = 0
+        with ResultWriter(output_path) as writer:
+            for result in self.iter_predict_batch(image_folder, skip=done):
+                writer.write(result)
+                processed += 1
+                if 'error' in result:
+                    print(f"Error processing {result['image_name']}: {result['error']}")
+                else:
+                    report.add(result)
+                if processed % Config.BATCH_CHUNK_SIZE == 0:
+                    print(f"Processed {processed} images ({report.total} scored in total)")
+        
+        summary = report.to_dict()
+        del summary['results']
+        summary['output_path'] = output_path
+        return summary
+    
+    def _iter_predictions(self, image_paths, chunk_size: int = None) -> Iterator[Dict]:
+        """Score image paths chunk by chunk, yielding results in order
+        
+        New feature cache entries are written every FEATURE_CACHE_FLUSH_EVERY
+        images and when the iteration ends.
+        """
+        processed = 0
+        pool = self._extraction_pool()
+        try:
+            for chunk in self._chunks(image_paths, chunk_size or Config.BATCH_CHUNK_SIZE):
+                yield from self._predict_chunk(chunk, pool)
+                processed += len(chunk)
+                if processed % Config.FEATURE_CACHE_FLUSH_EVERY < len(chunk):
+                    self._flush_feature_cache()
+        finally:
+            pool.close()
+            self._flush_feature_cache()
+    
+    def _extraction_pool(self) -> ExtractionPool:
+        """Extraction workers set up for predict_many on this detector"""
+        return ExtractionPool(self.feature_extractor, self.workers, self.preflight, self.cascade)
+    
+    def _predict_chunk(self, image_paths: List[str], pool: ExtractionPool = None) -> Iterator[Dict]:
+        results = self.predict_many(image_paths, self.workers, flush=False, pool=pool)
+        for img_path, result in zip(image_paths, results):
+            result['image_path'] = img_path
+            result['image_name'] = os.path.basename(img_path)
+            yield result
+    
     def _generate_report(self, results: List[Dict]) -> Dict:
         """Generate summary report from batch predictions"""
-        if not results:
-            return {
-                'total': 0,
-                'real_count': 0,
-                'fake_count': 0,
-                'uncertain_count': 0,
-                'avg_score': 0.0,
-                'results': []
-            }
-        
-        total = len(results)
-        real_count = sum(1 for r in results if r['prediction'] == 'REAL')
-        fake_count = sum(1 for r in results if r['prediction'] == 'FAKE')
-        uncertain_count = sum(1 for r in results if r['uncertain'])
-        avg_score = np.mean([r['authenticity_score'] for r in results])
-        
-        return {
-            'total': total,
-            'real_count': real_count,
-            'fake_count': fake_count,
-            'uncertain_count': uncertain_count,
-            'avg_score': float(avg_score),
-            'fake_percentage': float(fake_count / total * 100),
-            'real_percentage': float(real_count / total * 100),
-            'results': results
-        }
+        report = BatchReport()
+        for result in results:
+            report.add(result)
+        return report.to_dict(results)
     
     def save_model(self, filepath: str = None):
         """Save trained model"""
         filepath = filepath or Config.MODEL_PATH
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        # Cascade first: a server reloading on a change of the main file
+        # then finds the matching cascade stage already in place
+        cascade_path = CascadeModel.cascade_path(filepath)
+        if self.cascade is not None:
+            self.cascade.save(cascade_path)
+            print(f"Cascade stage saved to {cascade_path}")
+        elif os.path.exists(cascade_path):
+            # A cascade trained for an earlier model must not front this one
+            os.remove(cascade_path)
+            print(f"Removed the previous model's cascade stage {cascade_path}")
         self.ml_model.save(filepath)
         print(f"Model saved to {filepath}")
     
@@ -130,7 +593,23 @@ class DetectorService:
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Model file not found: {filepath}")
         self.ml_model.load(filepath)
+        # Extract features the same way the model was trained
+        self.feature_extractor.configure(self.ml_model.feature_config)
+        if not self._fixed_threshold:
+            self.threshold = self.ml_model.threshold or Config.THRESHOLD
         print(f"Model loaded from {filepath}")
+        
+        self.cascade = None
+        cascade_path = CascadeModel.cascade_path(filepath)
+        if Config.CASCADE_ENABLED and os.path.exists(cascade_path):
+            cascade = CascadeModel(Config.CASCADE_CONFIDENCE)
+            cascade.load(cascade_path)
+            # Both stages share one prepared image, so they must agree on resolution
+            if cascade.ml_model.feature_config.get('analysis_size') != self.feature_extractor.analysis_size:
+                raise ValueError(f"Cascade stage {cascade_path} was trained at a different "
+                                 f"analysis size than {filepath}")
+            self.cascade = cascade
+            print(f"Cascade stage loaded from {cascade_path}")
     
     @staticmethod
     def allowed_file(filename: str) -> bool:
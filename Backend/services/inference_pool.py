@@ -0,0 +1,89 @@
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
+from services.model_registry import ModelRegistry
+
+class PoolBusyError(Exception):
+    """Raised when the inference queue is full and new work is rejected"""
+
+class InferencePool:
+    """Bounded pool of inference worker threads
+    
+    Workers run tasks against a shared ModelRegistry, which picks the
+    model for each prediction, so a model swap never restarts them. Work is
+    queued in a bounded queue; when it is full, submit raises
+    PoolBusyError instead of letting requests pile up.
+    """
+    
+    def __init__(self, registry: ModelRegistry, workers: int, queue_size: int):
+        self.registry = registry
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        
+        for i in range(workers):
+            thread = threading.Thread(target=self._run, name=f'inference-worker-{i}',
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def submit(self, task: Callable[[ModelRegistry], object]) -> Future:
+        """Queue task(registry) for a worker and return its Future"""
+        future = Future()
+        try:
+            self._queue.put_nowait((task, future))
+        except queue.Full:
+            raise PoolBusyError("Inference queue is full")
+        return future
+    
+    def predict(self, image) -> Future:
+        """Queue a single prediction"""
+        return self.submit(lambda registry: registry.predict(image))
+    
+    def predict_many(self, images: List) -> List[Tuple[int, Future]]:
+        """Queue several images split into one batch per worker
+        
+        Returns (batch size, Future) pairs covering the images contiguously
+        and in order; each Future resolves to ModelRegistry.predict_many
+        results for its batch. If the queue fills up part way, batches
+        already queued are cancelled and PoolBusyError is raised.
+        """
+        if not images:
+            return []
+        n_batches = min(self.workers, len(images))
+        size = -(-len(images) // n_batches)
+        batches = []
+        try:
+            for start in range(0, len(images), size):
+                chunk = images[start:start + size]
+                future = self.submit(lambda registry, chunk=chunk: registry.predict_many(chunk))
+                batches.append((len(chunk), future))
+        except PoolBusyError:
+            for _, future in batches:
+                future.cancel()
+            raise
+        return batches
+    
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+    
+    def shutdown(self):
+        """Stop workers once the queued work is done"""
+        for _ in self._threads:
+            self._queue.put((None, None))
+        for thread in self._threads:
+            thread.join()
+    
+    def _run(self):
+        while True:
+            task, future = self._queue.get()
+            if task is None:
+                break
+            # Skip work whose caller already gave up (timed out)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(task(self.registry))
+            except Exception as e:
+                future.set_exception(e)
@@ -0,0 +1,80 @@
+import time
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future
+from models.ml_model import MLModel
+
+class MicroBatcher:
+    """Scores feature vectors from concurrent requests in shared batches
+    
+    Vectors submitted within window_ms of the first one in a batch (or
+    until max_batch are waiting) are scored with a single
+    predict_proba_batch call, and each caller gets its own probability
+    back through a Future. After shutdown, vectors are scored right away
+    on the calling thread, so a late caller is never left waiting.
+    """
+    
+    def __init__(self, ml_model: MLModel, window_ms: float = 5, max_batch: int = 32):
+        self.ml_model = ml_model
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        # Guards _closed, so nothing is queued behind the shutdown marker
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+    
+    def score(self, features: np.ndarray) -> Future:
+        """Queue a feature vector; the Future resolves to its probability"""
+        future = Future()
+        with self._lock:
+            if not self._closed:
+                self._queue.put((features, future))
+                return future
+        self._score_batch([(features, future)])
+        return future
+    
+    def shutdown(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            
+            self._score_batch(batch)
+            if stop:
+                break
+    
+    def _score_batch(self, batch):
+        try:
+            scores = self.ml_model.predict_proba_batch(np.array([f for f, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), ml_score in zip(batch, scores):
+            future.set_result(float(ml_score))
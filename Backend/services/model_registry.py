@@ -0,0 +1,348 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from models.cascade_model import CascadeModel
+from services.detector_service import DetectorService
+from services.micro_batcher import MicroBatcher
+from services.preflight import PreflightError
+from utils.metrics import Histogram, Metrics, metrics
+from config.config import Config
+
+class ModelStats:
+    """Prediction count, errors and latency of one model"""
+    
+    def __init__(self):
+        self.latency = Histogram(Metrics.DURATION_BUCKETS)
+        self.errors = 0
+        self.real = 0
+    
+    def to_dict(self) -> Dict:
+        total = self.latency.total
+        return {
+            'predictions': total,
+            'errors': self.errors,
+            'real_rate': self.real / total if total else None,
+            'mean_latency_ms': self.latency.sum / total * 1000 if total else None,
+            'latency_buckets': dict(zip(self.latency.buckets, self.latency.counts))
+        }
+
+class ModelDivergence:
+    """How far shadow-scored candidate results are from the served ones"""
+    
+    def __init__(self):
+        self.compared = 0
+        self.disagreements = 0
+        self.score_diff_sum = 0.0
+        self.score_diff_max = 0.0
+        self.dropped = 0
+    
+    def add(self, served: Dict, shadow: Dict):
+        diff = abs(served['authenticity_score'] - shadow['authenticity_score']) / 100
+        self.compared += 1
+        self.disagreements += served['prediction'] != shadow['prediction']
+        self.score_diff_sum += diff
+        self.score_diff_max = max(self.score_diff_max, diff)
+    
+    def to_dict(self) -> Dict:
+        return {
+            'compared': self.compared,
+            'disagreements': self.disagreements,
+            'disagreement_rate': self.disagreements / self.compared if self.compared else None,
+            'mean_score_diff': self.score_diff_sum / self.compared if self.compared else None,
+            'max_score_diff': self.score_diff_max,
+            'dropped': self.dropped
+        }
+
+class ModelRegistry:
+    """Named models held in memory and swapped without restarting the API
+    
+    A (re)load builds the new detector before swapping it in, so requests in
+    flight finish on their model; a candidate can shadow or A/B the active one.
+    """
+    
+    MODES = ('shadow', 'ab')
+    
+    def __init__(self, models: Dict[str, str], active: str, threshold: float = None,
+                 micro_batching: bool = False, batch_window_ms: float = 5,
+                 max_batch: int = 32, result_cache=None, reload_interval: float = 0):
+        if active not in models:
+            raise ValueError(f"Active model '{active}' is not configured")
+        self.paths = dict(models)
+        self.threshold = threshold
+        self.micro_batching = micro_batching
+        self.batch_window_ms = batch_window_ms
+        self.max_batch = max_batch
+        self.result_cache = result_cache
+        self.reload_interval = reload_interval
+        
+        self._detectors: Dict[str, DetectorService] = {}
+        self._signatures: Dict[str, Tuple] = {}
+        self._stats: Dict[str, ModelStats] = {name: ModelStats() for name in self.paths}
+        # (active, candidate, mode, share), replaced as a whole on every change
+        self._routing = (active, None, 'shadow', 0.0)
+        self._divergence = ModelDivergence()
+        # Serializes loads and routing changes; predictions never take it
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._shadow = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shadow-scorer')
+        self._shadow_pending = 0
+        
+        self.load(active)
+        for name in self.paths:
+            if name != active:
+                try:
+                    self.load(name)
+                except Exception as e:
+                    # The watcher loads it once its file appears or changes
+                    self._signatures[name] = self._signature(self.paths[name])
+                    print(f"Model '{name}' not loaded: {e}")
+        
+        self._stop = threading.Event()
+        self._watcher = None
+        if reload_interval > 0:
+            self._watcher = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+            self._watcher.start()
+    
+    @property
+    def active(self) -> str:
+        return self._routing[0]
+    
+    def detector(self, name: str = None) -> DetectorService:
+        """Loaded detector of a model, the active one by default"""
+        name = name or self.active
+        detector = self._detectors.get(name)
+        if detector is None:
+            raise ValueError(f"Model '{name}' is not loaded")
+        return detector
+    
+    def load(self, name: str) -> DetectorService:
+        """(Re)load a configured model from its file and swap it in"""
+        self._check_configured(name)
+        
+        with self._lock:
+            path = self.paths[name]
+            signature = self._signature(path)
+            # No process pools in the server: forking a process with these
+            # threads can copy a held lock (e.g. the metrics lock) into the child
+            detector = DetectorService(threshold=self.threshold, workers=1)
+            detector.load_model(path)
+            detector.result_cache = self.result_cache
+            if self.micro_batching:
+                detector.batcher = MicroBatcher(detector.ml_model, self.batch_window_ms,
+                                                self.max_batch)
+            previous = self._detectors.get(name)
+            self._detectors[name] = detector
+            self._signatures[name] = signature
+        
+        if previous is not None and previous.batcher is not None:
+            # Let requests already queued on the previous batcher share its
+            # batches; any later ones are scored inline (see MicroBatcher)
+            timer = threading.Timer(Config.REQUEST_TIMEOUT, previous.batcher.shutdown)
+            timer.daemon = True
+            timer.start()
+        print(f"Model '{name}' ready (version {detector.model_version})")
+        return detector
+    
+    def set_active(self, name: str):
+        """Serve every request (outside an A/B share) with model name"""
+        self._check_configured(name)
+        if name not in self._detectors:
+            self.load(name)
+        with self._lock:
+            _, candidate, mode, share = self._routing
+            if candidate == name:
+                candidate, share = None, 0.0
+            self._routing = (name, candidate, mode, share)
+            self._divergence = ModelDivergence()
+        print(f"Active model is now '{name}'")
+    
+    def set_candidate(self, name: Optional[str], mode: str = 'shadow', share: float = 0.1):
+        """Score a share of requests with model name as well (None stops it)"""
+        if mode not in self.MODES:
+            raise ValueError(f"Mode must be one of {', '.join(self.MODES)}")
+        if not 0 <= share <= 1:
+            raise ValueError("Share must be between 0 and 1")
+        if name is not None:
+            self._check_configured(name)
+            if name == self.active:
+                raise ValueError(f"Model '{name}' is already active")
+            if name not in self._detectors:
+                self.load(name)
+        with self._lock:
+            self._routing = (self._routing[0], name, mode, share if name else 0.0)
+            self._divergence = ModelDivergence()
+        if name is None:
+            print("Candidate scoring stopped")
+        else:
+            print(f"Candidate model is now '{name}' ({mode}, share {share})")
+    
+    def predict(self, image, localize: bool = False) -> Dict:
+        """DetectorService.predict on the model chosen for this request"""
+        served, shadow, divergence = self._route()
+        result = self._score(served, lambda detector: [detector.predict(image, localize=localize)])[0]
+        result['model'] = served
+        if shadow is not None:
+            self._submit_shadow(shadow, lambda detector: [detector.predict(image)],
+                                [result], divergence)
+        return result
+    
+    def predict_many(self, images: List, workers: int = 1) -> List[Dict]:
+        """DetectorService.predict_many with one model chosen for the whole call"""
+        if not images:
+            return []
+        served, shadow, divergence = self._route()
+        results = self._score(served, lambda detector: detector.predict_many(images, workers))
+        for result in results:
+            if 'error' not in result:
+                result['model'] = served
+        if shadow is not None:
+            self._submit_shadow(shadow, lambda detector: detector.predict_many(images, workers),
+                                results, divergence)
+        return results
+    
+    def describe(self) -> Dict:
+        """Routing, loaded versions and per-model statistics"""
+        active, candidate, mode, share = self._routing
+        models = {}
+        with self._stats_lock:
+            for name, path in self.paths.items():
+                detector = self._detectors.get(name)
+                models[name] = {
+                    'path': path,
+                    'loaded': detector is not None,
+                    'version': detector.model_version if detector else None,
+                    'threshold': detector.threshold if detector else None,
+                    'cascade': detector is not None and detector.cascade is not None,
+                    'stats': self._stats[name].to_dict()
+                }
+            divergence = self._divergence.to_dict()
+        return {
+            'active': active,
+            'candidate': candidate,
+            'mode': mode if candidate else None,
+            'share': share,
+            'divergence': divergence if candidate and mode == 'shadow' else None,
+            'models': models
+        }
+    
+    def shutdown(self):
+        """Stop the watcher, finish queued shadow scoring and stop the batchers"""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+        self._shadow.shutdown(wait=True)
+        for detector in self._detectors.values():
+            if detector.batcher is not None:
+                detector.batcher.shutdown()
+    
+    def _check_configured(self, name: str):
+        """Only models named in the configuration are ever loaded"""
+        if not isinstance(name, str) or name not in self.paths:
+            raise ValueError(f"Unknown model: {name}")
+    
+    def _route(self) -> Tuple[str, Optional[str], ModelDivergence]:
+        """(served model, shadow model or None, divergence record) for one request"""
+        active, candidate, mode, share = self._routing
+        divergence = self._divergence
+        if candidate is None or random.random() >= share:
+            return active, None, divergence
+        if mode == 'ab':
+            return candidate, None, divergence
+        return active, candidate, divergence
+    
+    def _score(self, name: str, predict: Callable[[DetectorService], List[Dict]]) -> List[Dict]:
+        """Run predict on a model, recording its latency per image and errors
+        
+        Preflight rejections are the input's fault, not the model's, and are
+        not counted as errors.
+        """
+        start = time.perf_counter()
+        try:
+            results = predict(self._detectors[name])
+        except PreflightError:
+            raise
+        except Exception:
+            with self._stats_lock:
+                self._stats[name].errors += 1
+            raise
+        seconds = time.perf_counter() - start
+        metrics.observe(f'predict:{name}', seconds)
+        
+        scored = [result for result in results if 'error' not in result]
+        # Preflight rejections carry a reason code
+        failed = [result for result in results if 'error' in result and 'reason' not in result]
+        with self._stats_lock:
+            stats = self._stats[name]
+            stats.errors += len(failed)
+            for result in scored:
+                stats.latency.observe(seconds / len(results))
+                stats.real += result['prediction'] == 'REAL'
+        return results
+    
+    def _submit_shadow(self, name: str, predict: Callable[[DetectorService], List[Dict]],
+                       served: List[Dict], divergence: ModelDivergence):
+        """Score the same images with a shadow model in the background
+        
+        At most Config.SHADOW_MAX_PENDING calls wait for the shadow scorer;
+        beyond that shadow scoring is skipped so it never builds a backlog.
+        """
+        with self._stats_lock:
+            if self._shadow_pending >= Config.SHADOW_MAX_PENDING:
+                divergence.dropped += 1
+                return
+            self._shadow_pending += 1
+        try:
+            self._shadow.submit(self._run_shadow, name, predict, served, divergence)
+        except RuntimeError:
+            # Shutting down
+            with self._stats_lock:
+                self._shadow_pending -= 1
+    
+    def _run_shadow(self, name: str, predict: Callable[[DetectorService], List[Dict]],
+                    served: List[Dict], divergence: ModelDivergence):
+        try:
+            results = self._score(name, predict)
+        except Exception:
+            results = []
+        with self._stats_lock:
+            self._shadow_pending -= 1
+            for served_result, shadow_result in zip(served, results):
+                if 'error' not in served_result and 'error' not in shadow_result:
+                    divergence.add(served_result, shadow_result)
+    
+    @staticmethod
+    def _signature(path: str) -> Tuple:
+        """Modification time and size of a model file and its cascade file"""
+        signature = []
+        for filepath in (path, CascadeModel.cascade_path(path)):
+            try:
+                stat = os.stat(filepath)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+    
+    def _watch(self):
+        """(Re)load models whose files changed and then stayed unchanged for an interval"""
+        changed: Dict[str, Tuple] = {}
+        while not self._stop.wait(self.reload_interval):
+            for name in self.paths:
+                signature = self._signature(self.paths[name])
+                if signature == self._signatures.get(name):
+                    changed.pop(name, None)
+                    continue
+                if changed.get(name) != signature:
+                    # Still being written (or just appeared); check again next time
+                    changed[name] = signature
+                    continue
+                del changed[name]
+                print(f"Model file of '{name}' changed, loading...")
+                try:
+                    self.load(name)
+                except Exception as e:
+                    # Keep serving the loaded version (if any) until a loadable file appears
+                    self._signatures[name] = signature
+                    print(f"Loading model '{name}' failed, keeping the loaded version: {e}")
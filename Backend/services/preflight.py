@@ -0,0 +1,113 @@
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple, Union
+from core.image_loader import ImageLoader, ImageRejectedError
+from utils.metrics import metrics
+from config.config import Config
+
+class PreflightError(ImageRejectedError):
+    """Raised when an image fails the preflight checks
+    
+    reason is a short machine-readable code: invalid_header, unreadable,
+    too_small, aspect_ratio, blank or low_information.
+    """
+    
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+    
+    def to_dict(self) -> Dict:
+        return {'error': str(self), 'reason': self.reason}
+
+class Preflight:
+    """Cheap checks rejecting images that cannot be an Aadhaar card
+    
+    Only the image header and a 1/8 scale grayscale thumbnail are decoded
+    (JPEG decodes straight to that scale), so invalid inputs are turned
+    away in milliseconds, before any feature is computed. Other formats
+    cannot decode at reduced scale, so they are decoded once here and the
+    pixels are passed on.
+    """
+    
+    def __init__(self, min_side: int = None, aspect_range: Tuple[float, float] = None,
+                 min_contrast: float = None, min_entropy: float = None):
+        self.min_side = min_side or Config.PREFLIGHT_MIN_SIDE
+        self.aspect_range = aspect_range or Config.PREFLIGHT_ASPECT_RANGE
+        self.min_contrast = min_contrast or Config.PREFLIGHT_MIN_CONTRAST
+        self.min_entropy = min_entropy or Config.PREFLIGHT_MIN_ENTROPY
+    
+    def check(self, image: Union[str, bytes, np.ndarray]) -> Union[bytes, np.ndarray]:
+        """Raise PreflightError if the image fails any check
+        
+        Size and aspect ratio come from the header, so the thumbnail is
+        only decoded for images that pass them. Returns the image, read
+        into bytes if it was a path or decoded if it is not a JPEG, so it
+        need not be read or decoded again.
+        """
+        with metrics.stage('preflight'):
+            image, image_format, width, height = self._read_header(image)
+            
+            short_side, long_side = sorted((width, height))
+            if short_side < self.min_side:
+                raise PreflightError('too_small', f"Image is {width}x{height}, the shorter "
+                                                  f"side must be at least {self.min_side} pixels")
+            aspect = long_side / short_side
+            low, high = self.aspect_range
+            if not low <= aspect <= high:
+                raise PreflightError('aspect_ratio', f"Aspect ratio {aspect:.2f} is outside "
+                                                     f"{low:.2f}-{high:.2f} expected for a card")
+            
+            if image_format not in (None, 'JPEG'):
+                image = self._decode(image)
+            thumbnail = self._thumbnail(image)
+            if thumbnail.std() < self.min_contrast:
+                raise PreflightError('blank', "Image is blank or nearly uniform")
+            histogram = np.bincount(thumbnail.ravel(), minlength=256) / thumbnail.size
+            histogram = histogram[histogram > 0]
+            entropy = -np.sum(histogram * np.log2(histogram))
+            if entropy < self.min_entropy:
+                raise PreflightError('low_information', f"Image carries too little detail "
+                                                         f"({entropy:.1f} bits per pixel)")
+        return image
+    
+    @staticmethod
+    def _read_header(image: Union[str, bytes, np.ndarray]
+                     ) -> Tuple[Union[bytes, np.ndarray], Optional[str], int, int]:
+        """The encoded bytes (or array) with its format (None for arrays), width and height"""
+        if isinstance(image, np.ndarray):
+            return image, None, image.shape[1], image.shape[0]
+        
+        if isinstance(image, str):
+            try:
+                with open(image, 'rb') as f:
+                    image = f.read()
+            except OSError as e:
+                raise PreflightError('unreadable', f"Could not read image: {e}")
+        
+        try:
+            image_format, width, height = ImageLoader.probe_image(image)
+        except ImageRejectedError as e:
+            raise PreflightError('invalid_header', str(e))
+        return image, image_format, width, height
+    
+    @staticmethod
+    def _decode(image: bytes) -> np.ndarray:
+        """Full colour decode, as feature extraction would do it"""
+        img = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise PreflightError('unreadable', "Could not decode image data")
+        return img
+    
+    @staticmethod
+    def _thumbnail(image: Union[bytes, np.ndarray]) -> np.ndarray:
+        """1/8 scale grayscale thumbnail"""
+        if isinstance(image, np.ndarray):
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+            size = (max(1, gray.shape[1] // 8), max(1, gray.shape[0] // 8))
+            return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        
+        thumbnail = cv2.imdecode(np.frombuffer(image, dtype=np.uint8),
+                                 cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if thumbnail is None or thumbnail.size == 0:
+            raise PreflightError('unreadable', "Could not decode image data")
+        return thumbnail
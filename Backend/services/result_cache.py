@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import cv2
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry TTL"""
+    
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: Dict):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class FileCacheBackend:
+    """Cache shared between worker processes through small JSON files
+    
+    Entries expire by file modification time; when the directory grows
+    past max_entries the oldest files are removed.
+    """
+    
+    PRUNE_EVERY = 100
+    
+    def __init__(self, cache_dir: str, max_entries: int = 10000, ttl: float = 3600):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest() + '.json')
+    
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl < time.time():
+                os.remove(path)
+                return None
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def set(self, key: str, value: Dict):
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+        
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        if prune:
+            self._prune()
+    
+    def _prune(self):
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.json'):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        continue
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+class ResultCache:
+    """Prediction result cache for repeated submissions
+    
+    Results are keyed by the SHA-256 of the upload bytes and, optionally,
+    a perceptual difference hash of a small grayscale thumbnail, so
+    trivially re-encoded copies of the same card also hit. Keys are scoped
+    by model version and threshold, so a different model or threshold
+    never serves stale results.
+    
+    The perceptual hash also matches copies with small local edits, i.e.
+    forgeries of a card already scored, so it is off by default.
+    """
+    
+    def __init__(self, backend, use_perceptual_hash: bool = False):
+        self.backend = backend
+        self.use_perceptual_hash = use_perceptual_hash
+    
+    @staticmethod
+    def perceptual_hash(data: bytes) -> Optional[str]:
+        """64-bit difference hash of the image, or None if it cannot be decoded"""
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        # Reduced decoding keeps this far cheaper than a full decode
+        thumbnail = cv2.imdecode(buffer, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if thumbnail is None:
+            return None
+        small = cv2.resize(thumbnail, (9, 8), interpolation=cv2.INTER_AREA)
+        bits = (small[:, 1:] > small[:, :-1]).flatten()
+        return f'{int("".join("1" if b else "0" for b in bits), 2):016x}'
+    
+    def keys_for(self, data: bytes, model_version: str, threshold: float) -> List[str]:
+        """Cache keys for an upload, exact hash first"""
+        scope = f'{model_version}:{threshold}'
+        keys = [f'{scope}:sha256:{hashlib.sha256(data).hexdigest()}']
+        if self.use_perceptual_hash:
+            phash = self.perceptual_hash(data)
+            if phash is not None:
+                keys.append(f'{scope}:dhash:{phash}')
+        return keys
+    
+    def get(self, keys: List[str]) -> Optional[Dict]:
+        for key in keys:
+            value = self.backend.get(key)
+            if value is not None:
+                return dict(value)
+        return None
+    
+    def set(self, keys: List[str], result: Dict):
+        for key in keys:
+            self.backend.set(key, dict(result))
@@ -0,0 +1,28 @@
+import os
+import numpy as np
+import pytest
+from models.ml_model import MLModel
+from config.config import Config
+
+MODEL_DIR = os.path.dirname(Config.MODEL_PATH)
+SHIPPED_MODELS = ['aadhaar_detector.pkl', 'aadhaar_only_model_TEXT.pkl']
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+@pytest.mark.parametrize('filename', SHIPPED_MODELS)
+def test_compiled_predictions_match_sklearn(filename, tmp_path):
+    pickled = MLModel()
+    pickled.load(os.path.join(MODEL_DIR, filename))
+    compiled_path = str(tmp_path / 'model.bin')
+    pickled.export_compiled(compiled_path)
+    compiled = MLModel()
+    compiled.load(compiled_path)
+    assert compiled.model is None and compiled.compiled is not None
+    
+    # Inputs spread around the training distribution reach many leaves
+    rng = np.random.default_rng(0)
+    scaled = rng.normal(size=(500, pickled.scaler.n_features_in_)) * 2
+    X = pickled.scaler.inverse_transform(scaled)
+    
+    np.testing.assert_allclose(compiled.predict_proba_batch(X),
+                               pickled.predict_proba_batch(X), atol=1e-6)
+    assert compiled.predict_proba(X[0]) == pytest.approx(pickled.predict_proba(X[0]), abs=1e-6)
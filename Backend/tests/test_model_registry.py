@@ -0,0 +1,49 @@
+import os
+import shutil
+import time
+import numpy as np
+import pytest
+from models.ml_model import MLModel
+from services.model_registry import ModelRegistry
+from config.config import Config
+
+def wait_for(condition, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+def test_hot_reload_swaps_model_and_retires_batcher(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'REQUEST_TIMEOUT', 0.1)
+    path = str(tmp_path / 'model.pkl')
+    shutil.copy(Config.MODEL_PATH, path)
+    registry = ModelRegistry({'main': path}, 'main', micro_batching=True,
+                             reload_interval=0.1)
+    try:
+        old = registry.detector()
+        features = np.zeros(old.ml_model.scaler.n_features_in_)
+        old_score = old.batcher.score(features).result(timeout=5)
+        
+        model = MLModel()
+        model.load(path)
+        model.threshold = 0.65
+        model.save(path)
+        # Keep the file's signature distinct even on coarse mtime clocks
+        os.utime(path, (time.time() + 5, time.time() + 5))
+        
+        assert wait_for(lambda: registry.detector() is not old)
+        new = registry.detector()
+        assert new.model_version == MLModel.file_version(path)
+        assert new.threshold == 0.65
+        assert new.batcher is not old.batcher
+        assert new.batcher.score(features).result(timeout=5) == pytest.approx(old_score)
+        
+        # The old batcher stops after the grace period, then scores late callers inline
+        assert wait_for(lambda: not old.batcher._thread.is_alive())
+        assert old.batcher._closed
+        assert old.batcher.score(features).result(timeout=1) == pytest.approx(old_score)
+    finally:
+        registry.shutdown()
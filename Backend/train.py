@@ -1,44 +1,118 @@
 """
 Training script for Aadhaar Forgery Detector
 Run this script to train a new model
+
+Each run writes a versioned artifact (<model>-<timestamp>.pkl) with a
+matching .metrics.json next to it, and installs it as Config.MODEL_PATH.
 """
+import argparse
+import json
+import os
+import time
+from itertools import chain
 from services.detector_service import DetectorService
 from core.image_loader import ImageLoader
+from models.cascade_model import CascadeModel
+from models.ml_model import MLModel
 from config.config import Config
-from utils.helpers import create_directory_structure, print_training_summary
+from utils.helpers import create_directory_structure
+
+def versioned_path(model_path: str, version: str) -> str:
+    """<root>-<version><ext> for a model path"""
+    root, ext = os.path.splitext(model_path)
+    return f"{root}-{version}{ext}"
+
+def save_metrics(filepath: str, training_metrics: dict):
+    """Write the training metrics as JSON"""
+    with open(filepath, 'w') as f:
+        json.dump(training_metrics, f, indent=2)
+    print(f"Metrics saved to {filepath}")
+
+def labeled_folders(real_folder: str, fake_folder: str):
+    """(path, label) pairs for every image under the real and fake folder trees"""
+    return chain(((path, 1) for path in ImageLoader.iter_images_recursive(real_folder)),
+                 ((path, 0) for path in ImageLoader.iter_images_recursive(fake_folder)))
 
-def main():
+def main(analysis_size: int = None, prune_below: float = None, cascade: bool = False,
+         folds: int = Config.CV_FOLDS, grow_trees: int = None, manifest: str = None,
+         max_per_class: int = None):
     # Create directory structure
     create_directory_structure()
-    
+
     # Initialize components
     print("Initializing Aadhaar Forgery Detector...")
-    detector = DetectorService(threshold=0.6)
-    image_loader = ImageLoader()
-    
-    # Load training images
-    print("\nLoading training images...")
+    detector = DetectorService(use_feature_cache=True, analysis_size=analysis_size)
+
+    if grow_trees:
+        # Keep the existing trees and feature settings, add new trees on top
+        detector.load_model(Config.MODEL_PATH)
+
+    # Training images are streamed from a manifest or the (nested) data folders
+    if manifest:
+        print(f"\nReading training images from {manifest}...")
+        labeled = lambda: ImageLoader.iter_manifest(manifest)
+    else:
+        print("\nScanning training images...")
+        labeled = lambda: labeled_folders(Config.REAL_IMAGES_FOLDER, Config.FAKE_IMAGES_FOLDER)
+
+    # Train model
+    start = time.perf_counter()
     try:
-        real_images = image_loader.load_images_from_folder(Config.REAL_IMAGES_FOLDER)
-        fake_images = image_loader.load_images_from_folder(Config.FAKE_IMAGES_FOLDER)
+        training_metrics = detector.train_labeled(labeled, max_per_class=max_per_class,
+                                                  prune_below=prune_below, cascade=cascade,
+                                                  folds=folds, grow_trees=grow_trees)
     except FileNotFoundError as e:
         print(f"Error: {e}")
         print("\nPlease ensure you have:")
         print(f"1. Real images in: {Config.REAL_IMAGES_FOLDER}")
         print(f"2. Fake images in: {Config.FAKE_IMAGES_FOLDER}")
+        print("or pass a manifest of path,label rows with --manifest")
         return
-    
-    # Print summary
-    print_training_summary(len(real_images), len(fake_images))
-    
-    # Train model
-    detector.train(real_images, fake_images)
-    
-    # Save model
+    training_seconds = time.perf_counter() - start
+
+    # Save the versioned artifact, then install it as the active model
+    version = time.strftime('%Y%m%d-%H%M%S')
+    model_path = versioned_path(Config.MODEL_PATH, version)
+    detector.save_model(model_path)
     detector.save_model()
-    
+
+    training_metrics.update({
+        'version': version,
+        'model_path': model_path,
+        'model_hash': MLModel.file_version(model_path),
+        'cascade_path': CascadeModel.cascade_path(model_path) if detector.cascade else None,
+        'grown_from': detector.ml_model.n_estimators - grow_trees if grow_trees else None,
+        'n_estimators': detector.ml_model.n_estimators,
+        'feature_config': detector.ml_model.feature_config,
+        'training_seconds': training_seconds
+    })
+    save_metrics(os.path.splitext(model_path)[0] + '.metrics.json', training_metrics)
+
     print("\n✅ Training completed successfully!")
-    print(f"Model saved to: {Config.MODEL_PATH}")
+    print(f"Model saved to: {Config.MODEL_PATH} (version {version})")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train the Aadhaar forgery detector")
+    parser.add_argument('--analysis-size', type=int, default=None,
+                        help="Downsample images so their longest side is at most this "
+                             "many pixels before feature analysis (default: native)")
+    parser.add_argument('--prune-below', type=float, default=None,
+                        help="Drop features with importance below this value (e.g. 0.02) "
+                             "and retrain, so they are never computed when serving")
+    parser.add_argument('--cascade', action='store_true',
+                        help="Also train a cheap first-stage model that decides confident "
+                             "cases without the expensive features")
+    parser.add_argument('--folds', type=int, default=Config.CV_FOLDS,
+                        help="Cross-validation folds used to report metrics and choose "
+                             "the threshold (0 to skip; a grown model keeps its threshold)")
+    parser.add_argument('--grow', type=int, default=None, metavar='TREES',
+                        help="Add this many trees to the current model instead of "
+                             "retraining it from scratch")
+    parser.add_argument('--manifest', default=None,
+                        help="CSV (path,label columns) or JSONL manifest of training images "
+                             "instead of the real/fake data folders")
+    parser.add_argument('--max-per-class', type=int, default=None,
+                        help="Train on a random sample of at most this many images per class")
+    args = parser.parse_args()
+    main(args.analysis_size, args.prune_below, args.cascade, args.folds, args.grow,
+         args.manifest, args.max_per_class)
@@ -0,0 +1,160 @@
+import io
+import time
+import random
+import cProfile
+import pstats
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Tuple
+from config.config import Config
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+    
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+class Metrics:
+    """Per-stage timing for the detection pipeline
+    
+    Code marks pipeline stages with stage() (or the timed() decorator).
+    When enabled, durations are aggregated into per-stage histograms that
+    render_prometheus() exposes. Independently, run_traced() collects the
+    stages of a single call into a trace, e.g. for a debug response, and
+    samples cProfile captures at the configured rate. With metrics disabled
+    and no trace active, a stage costs one attribute check.
+    """
+    
+    DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                        0.5, 1.0, 2.5, 5.0, 10.0)
+    MEGAPIXEL_BUCKETS = (0.1, 0.5, 1.0, 2.0, 4.0, 8.0, 12.0, 16.0, 24.0, 48.0)
+    
+    def __init__(self, enabled: bool = False, profile_rate: float = 0.0,
+                 max_profiles: int = 10):
+        self.enabled = enabled
+        self.profile_rate = profile_rate
+        self.profiles = deque(maxlen=max_profiles)
+        self._stages: Dict[str, Histogram] = {}
+        self._megapixels = Histogram(self.MEGAPIXEL_BUCKETS)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as pipeline stage name"""
+        trace = getattr(self._local, 'trace', None)
+        if not self.enabled and trace is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+    
+    def timed(self, name: str) -> Callable:
+        """Decorator timing every call of a function as stage name"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    def observe(self, name: str, seconds: float):
+        """Record a stage duration measured elsewhere"""
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            stages = trace['stages_ms']
+            stages[name] = stages.get(name, 0.0) + seconds * 1000
+        if self.enabled:
+            with self._lock:
+                histogram = self._stages.get(name)
+                if histogram is None:
+                    histogram = self._stages[name] = Histogram(self.DURATION_BUCKETS)
+                histogram.observe(seconds)
+    
+    def record_image(self, height: int, width: int):
+        """Record the dimensions of an image entering the pipeline"""
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            trace['image'] = {'height': int(height), 'width': int(width)}
+        if self.enabled:
+            with self._lock:
+                self._megapixels.observe(height * width / 1e6)
+    
+    def run_traced(self, fn: Callable, *args, **kwargs) -> Tuple[object, Dict]:
+        """Call fn in a fresh trace, returning (result, trace)
+        
+        The trace holds per-stage milliseconds and image dimensions. A
+        share of calls (profile_rate) also runs under cProfile and the
+        captured stats are kept in profiles.
+        """
+        previous = getattr(self._local, 'trace', None)
+        trace = self._local.trace = {'stages_ms': {}}
+        profiler = None
+        if self.profile_rate > 0 and random.random() < self.profile_rate:
+            profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            if profiler is not None:
+                result = profiler.runcall(fn, *args, **kwargs)
+            else:
+                result = fn(*args, **kwargs)
+        finally:
+            trace['total_ms'] = (time.perf_counter() - start) * 1000
+            self._local.trace = previous
+            if profiler is not None:
+                self._store_profile(profiler, trace)
+        return result, trace
+    
+    def _store_profile(self, profiler: cProfile.Profile, trace: Dict):
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(30)
+        self.profiles.append({
+            'time': time.time(),
+            'total_ms': trace['total_ms'],
+            'stats': output.getvalue()
+        })
+    
+    def render_prometheus(self) -> str:
+        """All histograms in the Prometheus text exposition format"""
+        lines = [
+            '# HELP aadhaar_stage_duration_seconds Duration of detection pipeline stages',
+            '# TYPE aadhaar_stage_duration_seconds histogram'
+        ]
+        with self._lock:
+            for name, histogram in sorted(self._stages.items()):
+                lines.extend(self._render_histogram('aadhaar_stage_duration_seconds',
+                                                    histogram, f'stage="{name}",'))
+            lines.append('# HELP aadhaar_image_megapixels Size of analysed images')
+            lines.append('# TYPE aadhaar_image_megapixels histogram')
+            lines.extend(self._render_histogram('aadhaar_image_megapixels',
+                                                self._megapixels, ''))
+        return '\n'.join(lines) + '\n'
+    
+    @staticmethod
+    def _render_histogram(metric: str, histogram: Histogram, labels: str) -> List[str]:
+        lines = [f'{metric}_bucket{{{labels}le="{bound}"}} {count}'
+                 for bound, count in zip(histogram.buckets, histogram.counts)]
+        lines.append(f'{metric}_bucket{{{labels}le="+Inf"}} {histogram.total}')
+        label_set = f'{{{labels.rstrip(",")}}}' if labels else ''
+        lines.append(f'{metric}_sum{label_set} {histogram.sum}')
+        lines.append(f'{metric}_count{label_set} {histogram.total}')
+        return lines
+
+# Process-wide instance used by the pipeline
+metrics = Metrics(enabled=Config.METRICS_ENABLED, profile_rate=Config.PROFILE_SAMPLE_RATE)
@@ -0,0 +1,90 @@
+import os
+import csv
+import json
+from typing import Dict, Iterator
+
+class ResultWriter:
+    """Appends prediction results to a JSONL or CSV file as they complete"""
+    
+    CSV_FIELDS = ['image_path', 'image_name', 'prediction', 'authenticity_score',
+                  'threshold', 'uncertain', 'error']
+    
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.is_csv = filepath.lower().endswith('.csv')
+        write_header = self.is_csv and not os.path.exists(filepath)
+        
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        ends_cleanly = self._ends_with_newline(filepath)
+        self._file = open(filepath, 'a', newline='', encoding='utf-8')
+        if not ends_cleanly:
+            # Terminate a line left truncated by an interrupted run
+            self._file.write('\n')
+        if self.is_csv:
+            self._csv = csv.DictWriter(self._file, fieldnames=self.CSV_FIELDS,
+                                       extrasaction='ignore')
+            if write_header:
+                self._csv.writeheader()
+    
+    @staticmethod
+    def _ends_with_newline(filepath: str) -> bool:
+        if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+            return True
+        with open(filepath, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+    
+    def write(self, result: Dict):
+        """Append one result and flush it so progress survives a crash"""
+        if self.is_csv:
+            self._csv.writerow(result)
+        else:
+            self._file.write(json.dumps(result) + '\n')
+        self._file.flush()
+    
+    def close(self):
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    @staticmethod
+    def read_results(filepath: str) -> Iterator[Dict]:
+        """Read back results written by a previous (possibly interrupted) run"""
+        if not os.path.exists(filepath):
+            return
+        
+        with open(filepath, newline='', encoding='utf-8') as f:
+            if filepath.lower().endswith('.csv'):
+                for row in csv.DictReader(f):
+                    if row.get('error'):
+                        yield {'image_path': row['image_path'], 'error': row['error']}
+                        continue
+                    try:
+                        yield {
+                            'image_path': row['image_path'],
+                            'image_name': row['image_name'],
+                            'prediction': row['prediction'],
+                            'authenticity_score': float(row['authenticity_score']),
+                            'threshold': float(row['threshold']),
+                            'uncertain': row['uncertain'] == 'True'
+                        }
+                    except (KeyError, TypeError, ValueError):
+                        # A crash can leave a truncated last row behind
+                        continue
+            else:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave a truncated last line behind
+                        continue
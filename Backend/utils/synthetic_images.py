@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+
+# Aadhaar cards follow the ID-1 format (85.6 x 53.98 mm)
+CARD_ASPECT = 85.6 / 53.98
+
+def generate_card_image(height: int, seed: int = 0, tampered: bool = False) -> np.ndarray:
+    """Generate a synthetic card-like BGR image of the given height
+    
+    The layout (header band, photo box, lines of text, light sensor noise)
+    loosely resembles a scanned ID card so that every feature has
+    realistic work to do. With tampered, a region is blurred and pasted
+    over with different noise, mimicking a crude edit.
+    """
+    rng = np.random.default_rng(seed)
+    width = int(round(height * CARD_ASPECT))
+    scale = height / 540
+    
+    img = np.full((height, width, 3), 235, dtype=np.uint8)
+    img[:int(80 * scale)] = (40, 120, 200)
+    
+    # Photo box
+    y0, x0 = int(130 * scale), int(40 * scale)
+    cv2.rectangle(img, (x0, y0), (x0 + int(180 * scale), y0 + int(220 * scale)),
+                  (120, 110, 100), -1)
+    
+    # Text lines
+    font_scale = 0.8 * scale
+    thickness = max(1, int(round(2 * scale)))
+    for line in range(8):
+        y = int((150 + line * 40) * scale)
+        text = ''.join(rng.choice(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 '), 18))
+        cv2.putText(img, text, (int(260 * scale), y), cv2.FONT_HERSHEY_SIMPLEX,
+                    font_scale, (20, 20, 20), thickness)
+    
+    if tampered:
+        ty, tx = int(300 * scale), int(260 * scale)
+        th, tw = int(40 * scale), int(300 * scale)
+        patch = cv2.GaussianBlur(img[ty:ty + th, tx:tx + tw], (5, 5), 0)
+        img[ty:ty + th, tx:tx + tw] = patch
+    
+    noise = rng.normal(0, 4 if not tampered else 9, img.shape)
+    return np.clip(img.astype(np.float64) + noise, 0, 255).astype(np.uint8)
+
+def encode_image(img: np.ndarray, fmt: str = 'jpg', quality: int = 92) -> bytes:
+    """Encode a BGR array to image file bytes"""
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality] if fmt in ('jpg', 'jpeg') else []
+    ok, buffer = cv2.imencode('.' + fmt, img, params)
+    if not ok:
+        raise ValueError(f"Could not encode image as {fmt}")
+    return buffer.tobytes()
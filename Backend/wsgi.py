@@ -0,0 +1,12 @@
+"""
+Production entry point for the detection API
+
+Serve with any WSGI server, for example:
+  waitress-serve --listen=0.0.0.0:5000 --threads=16 wsgi:app
+  gunicorn -w 2 --threads 16 -b 0.0.0.0:5000 wsgi:app
+"""
+from app import app
+
+if __name__ == "__main__":
+    from waitress import serve
+    serve(app, host='0.0.0.0', port=5000, threads=16)